@@ -1,6 +1,16 @@
 # LLM.py
-from groq import Groq
+import asyncio
+import json
+import logging
 import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Iterator, Optional
+
+import httpx
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,31 +19,285 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 if not GROQ_API_KEY:
     raise RuntimeError("GROQ_API_KEY not set. Add it to environment or .env")
 
-client = Groq(api_key=GROQ_API_KEY)
+# ===== CONFIG =====
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # seconds for a whole call, including retries
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))  # longest gap between streamed chunks
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = 0.5  # seconds, doubled per attempt
+LLM_BACKOFF_MAX = 8.0
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # in-flight calls per process
+LLM_POOL_SIZE = 20  # keep-alive connections shared by all sessions
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Per-stage model settings. Override them in LLM_PROFILES_FILE (JSON, same shape, partial
+# entries allowed) or per field with LLM_<PROFILE>_MODEL / _MAX_TOKENS / _TEMPERATURE / _TIMEOUT.
+LLM_PROFILES_FILE = os.getenv("LLM_PROFILES_FILE", "llm_profiles.json")
+DEFAULT_PROFILES = {
+    # Final tutor answer: the large model
+    "answer": {"model": "llama-3.3-70b-versatile", "max_tokens": 1024, "temperature": 0.6, "timeout": LLM_TIMEOUT},
+    # Retrieval query expansion: paid before the first answer token, so small and capped
+    "expansion": {"model": "llama-3.1-8b-instant", "max_tokens": 100, "temperature": 0.4, "timeout": 15.0},
+    # Hypothetical answer embedded for HyDE retrieval, generated alongside the expansion
+    "hyde": {"model": "llama-3.1-8b-instant", "max_tokens": 200, "temperature": 0.4, "timeout": 15.0},
+    # Rolling chat history summary, runs in the background
+    "summary": {"model": "llama-3.1-8b-instant", "max_tokens": 300, "temperature": 0.2, "timeout": 30.0},
+}
+# ==================
+
+
+class LLMError(Exception):
+    """A call that failed for good (non-retryable status, retries exhausted or timed out)."""
+
+
+class RetryableError(Exception):
+    """A 429/5xx response; `retry_after` is the server's Retry-After header, if any."""
+
+    def __init__(self, status: int, retry_after: Optional[str] = None):
+        super().__init__(f"HTTP {status}")
+        self.retry_after = retry_after
+
+
+# ---------- MODEL PROFILES ----------
+PROFILE_FIELDS = {"model": str, "max_tokens": int, "temperature": float, "timeout": float}
+
+
+def load_profiles() -> dict:
+    """DEFAULT_PROFILES merged with LLM_PROFILES_FILE and LLM_<PROFILE>_<FIELD> env overrides."""
+    profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+    try:
+        with open(LLM_PROFILES_FILE, "r", encoding="utf-8") as f:
+            for name, overrides in json.load(f).items():
+                profiles.setdefault(name, dict(profiles["answer"])).update(overrides)
+    except FileNotFoundError:
+        pass
+    except ValueError as e:
+        logging.error("Ignoring invalid %s: %s", LLM_PROFILES_FILE, e)
+
+    for name, profile in profiles.items():
+        for field, cast in PROFILE_FIELDS.items():
+            value = os.getenv(f"LLM_{name.upper()}_{field.upper()}")
+            if value:
+                profile[field] = cast(value)
+    return profiles
+
+
+PROFILES = load_profiles()
 
 
-def run_llm(system_prompt="You are a Smart Financial Advisor.", user_query="Hello!!"):
+def get_profile(name: str) -> dict:
+    if name not in PROFILES:
+        logging.warning("Unknown LLM profile '%s', using 'answer'", name)
+        name = "answer"
+    return PROFILES[name]
+
+
+# ---------- BACKGROUND LOOP ----------
+# One event loop thread owns the HTTP client, so every caller shares its connection
+# pool and concurrency limit, and sync callers (Streamlit) don't each run their own loop.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[httpx.AsyncClient] = None
+_semaphore: Optional[asyncio.Semaphore] = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-gateway", daemon=True).start()
+        return _loop
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared keep-alive client; must be called from the gateway loop."""
+    global _client, _semaphore
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=GROQ_BASE_URL,
+            headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=LLM_POOL_SIZE, max_keepalive_connections=LLM_POOL_SIZE),
+        )
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _client
+
+
+def retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
     """
-    Streams tokens from Groq LLM as they arrive.
-    Yields: string chunks
+    Server-requested delay when given (seconds or an HTTP date), otherwise exponential
+    backoff with full jitter. Retry-After is honoured as is; the caller gives up if it
+    doesn't fit in the remaining deadline.
+    """
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            when = parsedate_to_datetime(retry_after)
+            return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            logging.warning("Ignoring unparseable Retry-After: %r", retry_after)
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+def describe(error: Exception) -> str:
+    """Error text for logs and LLMError; httpx timeouts often have an empty message."""
+    return str(error) or type(error).__name__
+
+
+# ---------- ASYNC API ----------
+_DONE = object()
+
+
+async def _astream(system_prompt: str, user_query: str, profile: str = "answer") -> AsyncIterator[str]:
+    """
+    Stream completion text from the Groq chat API as it arrives, using the model,
+    token cap, temperature and timeout of the given stage profile.
+    429/5xx responses and connection errors are retried with jitter (honouring Retry-After)
+    until the first token is out; after that a failure is raised, never replayed.
+    Raises LLMError when the call can't be completed within the profile's timeout.
+    Must run on the gateway loop, which owns the client and the concurrency limit.
     """
+    client = get_client()
+    settings = get_profile(profile)
+    timeout = settings.get("timeout", LLM_TIMEOUT)
+    payload = {
+        "model": settings["model"],
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_query},
+        ],
+        "temperature": settings["temperature"],
+        "max_completion_tokens": settings["max_tokens"],
+        "top_p": 1,
+        "stream": True,
+    }
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_query},
-            ],
-            temperature=0.6,
-            max_completion_tokens=1024,
-            top_p=1,
-            stream=True,
-        )
+        async with asyncio.timeout_at(deadline):
+            await _semaphore.acquire()  # queueing for a slot counts against the timeout too
+    except TimeoutError as e:
+        raise LLMError(f"timed out after {timeout:.0f}s waiting for a free slot") from e
+
+    try:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            yielded = False
+            try:
+                # Bounds the whole attempt (connect, headers and every chunk), not just the gaps
+                async with asyncio.timeout_at(deadline):
+                    async with client.stream("POST", "/chat/completions", json=payload) as response:
+                        if response.status_code in RETRY_STATUSES:
+                            await response.aread()
+                            raise RetryableError(response.status_code, response.headers.get("retry-after"))
+                        if response.status_code >= 400:
+                            body = (await response.aread()).decode("utf-8", errors="replace")
+                            raise LLMError(f"HTTP {response.status_code}: {body[:300]}")
 
-        for chunk in completion:
-            delta = chunk.choices[0].delta
-            if delta and delta.content:
-                yield delta.content
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                return
+                            delta = json.loads(data)["choices"][0].get("delta") or {}
+                            if delta.get("content"):
+                                yielded = True
+                                yield delta["content"]
+                        return
+
+            except TimeoutError as e:
+                raise LLMError(f"timed out after {timeout:.0f}s") from e
+
+            except (RetryableError, httpx.TransportError) as e:
+                if yielded or attempt == LLM_MAX_RETRIES:
+                    raise LLMError(describe(e)) from e
+
+                delay = retry_delay(attempt, getattr(e, "retry_after", None))
+                if loop.time() + delay > deadline:
+                    raise LLMError(f"timed out after {timeout:.0f}s ({describe(e)})") from e
+                logging.warning("LLM call failed (%s), retry %d/%d in %.2fs",
+                                describe(e), attempt + 1, LLM_MAX_RETRIES, delay)
+                await asyncio.sleep(delay)
+    finally:
+        _semaphore.release()
+
+
+async def astream_llm(system_prompt: str, user_query: str, profile: str = "answer") -> AsyncIterator[str]:
+    """
+    Async version of run_llm, usable from any event loop: the call runs on the shared
+    gateway loop and its chunks are handed back to the caller's loop.
+    Raises LLMError like _astream; closing the generator cancels the call.
+    """
+    gateway = get_loop()
+    caller = asyncio.get_running_loop()
+    if caller is gateway:
+        async for text in _astream(system_prompt, user_query, profile):
+            yield text
+        return
 
-    except Exception as e:
-        yield f"⚠️ Error generating response: {str(e)}"
+    chunks = asyncio.Queue()
+
+    def hand_over(item):
+        try:
+            caller.call_soon_threadsafe(chunks.put_nowait, item)
+        except RuntimeError:
+            pass  # the caller's loop is gone
+
+    async def pump():
+        try:
+            async for text in _astream(system_prompt, user_query, profile):
+                hand_over(text)
+        except Exception as e:
+            hand_over(e)
+        finally:
+            hand_over(_DONE)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), gateway)
+    try:
+        while True:
+            item = await chunks.get()
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        future.cancel()
+
+
+# ---------- SYNC API ----------
+
+
+def run_llm(system_prompt="You are a Smart Financial Advisor.", user_query="Hello!!",
+            profile: str = "answer") -> Iterator[str]:
+    """
+    Streams tokens from Groq LLM as they arrive, using the model settings of `profile`.
+    Runs the call on the shared gateway loop; closing the generator cancels it.
+    Yields: string chunks
+    """
+    chunks = queue.Queue()
+
+    async def pump():
+        try:
+            async for text in _astream(system_prompt, user_query, profile):
+                chunks.put(text)
+        except Exception as e:
+            chunks.put(f"⚠️ Error generating response: {str(e)}")
+        finally:
+            chunks.put(_DONE)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_loop())
+    try:
+        while True:
+            item = chunks.get()
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        future.cancel()
@@ -1,12 +1,13 @@
 import logging
+import time
 from RAG import ragFusion
+from RAG.traceLog import trace_log
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 SEARCH_KWARGS = 5
 
-def get_context(question: str, vectorstore=None):
-    content = """  
+CONTENT = """  
                 You are a professional **Coding Tutorial Chatbot** embedded in a **Streamlit app**.  
                 Your purpose is to help learners understand programming concepts, complete exercises,  
                 and build confidence in coding—strictly using the provided **context documents (vectorstore)**.  
@@ -53,25 +54,27 @@ def get_context(question: str, vectorstore=None):
                 
             """
 
+
+def get_context(question: str, vectorstore=None, trace: dict = None):
+    content = CONTENT
+    trace = {} if trace is None else trace
+    start = time.perf_counter()
+
     logging.info("Starting RAG...")
     logging.info("Retrieving...")
     retriever = vectorstore.as_retriever(search_kwargs={"k": SEARCH_KWARGS})
     logging.info("Retriever Created!")
-    context, queries = ragFusion.rag_fusion_chain(question, retriever)
+    context, queries = ragFusion.rag_fusion_chain(question, retriever, trace=trace)
     logging.info('RAG Done!')
-    save_to_txt(question, context, content, queries)
+    trace_log.log({"question": question, **trace, "total": time.perf_counter() - start})
     return context, content
 
-def save_to_txt(question: str, context: str, content: str, queries: list, output_path="rag_output.txt"):
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write("======== RAG FUSION LOG ========\n")
-        f.write(f"Question:\n{question}\n\n")
-        f.write("-------- query GENERATED --------\n")
-        for i, query in enumerate(queries, 1):
-            f.write(f"Query {i}: {query}\n")    
-        f.write("\n")
-        f.write("-------- CONTEXT RETRIEVED --------\n")
-        f.write(f"{context.strip()}\n\n")
-        f.write("-------- INSTRUCTIONS / PROMPT --------\n")
-        f.write(f"{content.strip()}\n\n")
-        f.write("======== END OF LOG ========\n")
\ No newline at end of file
+
+def get_fast_context(question: str, vectorstore=None, trace: dict = None):
+    """Context from a single lookup on the raw question, for answering while get_context runs."""
+    trace = {} if trace is None else trace
+    start = time.perf_counter()
+    retriever = vectorstore.as_retriever(search_kwargs={"k": SEARCH_KWARGS})
+    context = ragFusion.fast_context(question, retriever, trace)
+    trace_log.log({"question": question, **trace, "total": time.perf_counter() - start})
+    return context, CONTENT
@@ -0,0 +1,109 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+# ===== CONFIG =====
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "500"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))  # seconds
+# ==================
+
+
+def replay(answer: str) -> Iterator[str]:
+    """Yield a cached answer word by word so it renders like a live LLM stream."""
+    for match in re.finditer(r"\S+\s*|\s+", answer):
+        yield match.group(0)
+
+
+class SemanticAnswerCache:
+    """
+    Small in-memory vector index of past answers.
+    A question hits when its embedding is within `threshold` cosine similarity
+    of a cached question. Entries are evicted LRU-first and after `ttl` seconds,
+    and the whole cache is dropped when the vectorstore index version changes.
+    """
+
+    def __init__(self, embeddings, index_version: Callable[[], str],
+                 threshold: float = ANSWER_CACHE_THRESHOLD,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: float = ANSWER_CACHE_TTL):
+        self.embeddings = embeddings
+        self.index_version = index_version
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # question -> (unit vector, answer, created)
+        self._version = index_version()
+        self._lock = threading.Lock()
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self):
+        version = self.index_version()
+        if version != self._version:
+            logging.info("Vectorstore rebuilt, invalidating %d cached answers", len(self._entries))
+            self._entries.clear()
+            self._version = version
+
+    def lookup(self, question: str) -> Optional[str]:
+        """Return the cached answer for a semantically matching question, or None."""
+        vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+
+            now = time.time()
+            for key in [k for k, (_, _, created) in self._entries.items() if now - created > self.ttl]:
+                del self._entries[key]
+
+            if self._entries:
+                keys = list(self._entries)
+                matrix = np.stack([self._entries[k][0] for k in keys])
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    self._entries.move_to_end(keys[best])
+                    logging.info(
+                        "Answer cache hit (%.3f) for '%s' via '%s' [hits=%d misses=%d]",
+                        similarities[best], question, keys[best], self.hits, self.misses
+                    )
+                    return self._entries[keys[best]][1]
+
+            self.misses += 1
+            logging.info("Answer cache miss for '%s' [hits=%d misses=%d]", question, self.hits, self.misses)
+            return None
+
+    def store(self, question: str, answer: str):
+        vector = self._embed(question)
+        with self._lock:
+            self._check_version()
+            self._entries[question] = (vector, answer, time.time())
+            self._entries.move_to_end(question)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,96 @@
+from typing import List
+
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from RAG import embedding
+from RAG.contextAssembler import count_tokens
+
+# ===== CONFIG =====
+MAX_CHUNK_TOKENS = embedding.CHUNK_SIZE
+SPLIT_OVERLAP_TOKENS = embedding.CHUNK_OVERLAP  # only used inside prose too long for one chunk
+OVERVIEW_TITLE = "Overview"
+# ==================
+
+
+def split_prose(text: str, budget: int) -> List[str]:
+    """Keep prose whole when it fits; otherwise split it with overlap so no sentence loses its neighbours."""
+    if count_tokens(text) <= budget:
+        return [text]
+    splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=embedding.TIKTOKEN_ENCODING,
+        chunk_size=budget,
+        chunk_overlap=min(SPLIT_OVERLAP_TOKENS, budget // 4),
+    )
+    return splitter.split_text(text)
+
+
+def pack(header: str, units: List[str], budget: int) -> List[str]:
+    """
+    Greedily pack whole units (prose pieces, code examples) into chunks of at most `budget` tokens,
+    each starting with `header`. A unit is never cut: one larger than the budget gets a chunk of its own.
+    """
+    chunks, group, used = [], [], 0
+    for unit in units:
+        size = count_tokens(unit)
+        if group and used + size > budget:
+            chunks.append("\n\n".join([header] + group))
+            group, used = [], 0
+        group.append(unit)
+        used += size
+    if group:
+        chunks.append("\n\n".join([header] + group))
+    return chunks
+
+
+def section_chunks(course: str, section: dict, source_file: str, index: int) -> List[Document]:
+    """
+    Chunk one crawled section: the whole section when it fits, otherwise its summary
+    (split with overlap only if it is too long on its own) followed by whole examples.
+    Every chunk carries course, section_title and url metadata.
+    """
+    title = (section.get("title") or "").strip()
+    summary = (section.get("summary") or "").strip()
+    examples = [e.strip() for e in section.get("examples") or [] if isinstance(e, str) and e.strip()]
+    if not summary and not examples:
+        return []
+
+    header = f"{course} > {title}" if title else course
+    budget = max(MAX_CHUNK_TOKENS - count_tokens(header), 1)
+    units = (split_prose(summary, budget) if summary else []) + examples
+
+    metadata = {
+        "source_file": source_file,
+        "course": course,
+        "section_title": title,
+        "section_index": index,
+        "url": section.get("url") or "",
+    }
+    return [Document(page_content=text, metadata=dict(metadata)) for text in pack(header, units, budget)]
+
+
+def overview_chunks(course: str, description: str, objectives: list, source_file: str, url: str = "") -> List[Document]:
+    """Course description and objectives as their own section."""
+    summary = "\n".join(filter(None, [(description or "").strip()] + [o.strip() for o in objectives or []]))
+    section = {"title": OVERVIEW_TITLE, "summary": summary, "url": url}
+    return section_chunks(course, section, source_file, -1)
+
+
+def course_chunks(course_json: dict, source_file: str) -> List[Document]:
+    """Chunk a course JSON written by the crawlers (course_name, description, objectives, course_summary)."""
+    course = course_json.get("course_name") or source_file
+    url = course_json.get("course_url") or ""
+    chunks = overview_chunks(course, course_json.get("description", ""), course_json.get("objectives", []),
+                             source_file, url)
+    for index, section in enumerate(course_json.get("course_summary") or []):
+        if isinstance(section, dict):
+            chunks.extend(section_chunks(course, section, source_file, index))
+    return chunks
+
+
+def record_chunks(record: dict, source_file: str) -> List[Document]:
+    """Chunk one record of the crawlers' JSONL stream (a section, or a finished course)."""
+    if record.get("type") == "course":
+        return overview_chunks(record["course"], record.get("description", ""), record.get("objectives", []),
+                               source_file, record.get("url", ""))
+    return section_chunks(record["course"], record, source_file, record.get("index", 0))
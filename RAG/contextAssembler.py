@@ -0,0 +1,140 @@
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Any, List, Tuple
+
+import tiktoken
+
+from RAG import embedding
+
+# ===== CONFIG =====
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))  # word-shingle Jaccard similarity
+MIN_MERGE_OVERLAP = 40  # chars a chunk boundary must share to count as adjacent
+MAX_MERGE_OVERLAP = embedding.CHUNK_OVERLAP * 8  # generous chars-per-token bound on the splitter overlap
+SHINGLE_SIZE = 5
+# ==================
+
+
+@lru_cache(maxsize=1)
+def get_encoder():
+    return tiktoken.get_encoding(embedding.TIKTOKEN_ENCODING)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_encoder().encode(text, disallowed_special=()))
+
+
+def shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def is_near_duplicate(a: set, b: set) -> bool:
+    if not a or not b:
+        return False
+    overlap = len(a & b)
+    # Jaccard, or one chunk almost entirely contained in the other
+    return overlap / len(a | b) >= DEDUP_THRESHOLD or overlap / min(len(a), len(b)) >= 0.95
+
+
+def merge_overlap(first: str, second: str) -> str:
+    """
+    If `second` starts with text that ends `first` (the splitter's chunk overlap),
+    return the two chunks joined without repeating that text, else "".
+    """
+    probe = second[:MIN_MERGE_OVERLAP]
+    if len(probe) < MIN_MERGE_OVERLAP:
+        return ""
+    start = max(0, len(first) - MAX_MERGE_OVERLAP)
+    pos = first.find(probe, start)
+    while pos != -1:
+        if second.startswith(first[pos:]):
+            return first + second[len(first) - pos:]
+        pos = first.find(probe, pos + 1)
+    return ""
+
+
+def strip_header(first: str, second: str) -> str:
+    """
+    Section chunks all start with the same "course > title" header (RAG/chunker.py);
+    drop it from `second` when `first` starts with it too, so only the bodies are overlapped.
+    """
+    header = first.split("\n\n", 1)[0] + "\n\n"
+    if len(header) < len(first) and second.startswith(header):
+        return second[len(header):]
+    return second
+
+
+def merge_adjacent(docs: List[Any]) -> List[Tuple[str, str]]:
+    """
+    Merge chunks from the same source_file (and section, for structured chunks) whose
+    boundaries overlap. A section header shared by both chunks is kept once.
+    The merged text takes the position of the higher-ranked chunk.
+    Returns (source_file, text) pairs in rank order.
+    """
+    merged, keys = [], []
+    for doc in docs:
+        source = doc.metadata.get("source_file", "")
+        section = doc.metadata.get("section_index")
+        text = doc.page_content
+        for i, (_, other_text) in enumerate(merged):
+            if keys[i] != (source, section):
+                continue
+            if section is None:
+                joined = merge_overlap(other_text, text) or merge_overlap(text, other_text)
+            else:
+                joined = merge_overlap(other_text, strip_header(other_text, text)) \
+                    or merge_overlap(text, strip_header(text, other_text))
+            if joined:
+                merged[i] = (source, joined)
+                break
+        else:
+            merged.append((source, text))
+            keys.append((source, section))
+    return merged
+
+
+def assemble_context(docs: List[Any], token_budget: int = CONTEXT_TOKEN_BUDGET) -> Tuple[str, dict]:
+    """
+    Build the prompt context from fused documents (best first):
+    1. Drop near-duplicate chunks
+    2. Merge overlapping neighbours from the same source_file
+    3. Keep chunks in rank order until the token budget is spent
+    Returns the context string and token stats.
+    """
+    raw_tokens = sum(count_tokens(doc.page_content) for doc in docs)
+
+    unique_docs, seen = [], []
+    for doc in docs:
+        doc_shingles = shingles(doc.page_content)
+        if any(is_near_duplicate(doc_shingles, other) for other in seen):
+            continue
+        seen.append(doc_shingles)
+        unique_docs.append(doc)
+
+    parts, used_tokens = [], 0
+    for _, text in merge_adjacent(unique_docs):
+        tokens = count_tokens(text)
+        if used_tokens + tokens > token_budget:
+            continue
+        parts.append(text)
+        used_tokens += tokens
+
+    context = "\n\n".join(parts)
+    stats = {
+        "chunks_in": len(docs),
+        "chunks_deduplicated": len(docs) - len(unique_docs),
+        "chunks_out": len(parts),
+        "raw_tokens": raw_tokens,
+        "context_tokens": used_tokens,
+        "tokens_saved": raw_tokens - used_tokens,
+    }
+    logging.info(
+        "Context assembled: %d tokens from %d/%d chunks (%d tokens saved, %d near-duplicates dropped)",
+        used_tokens, len(parts), len(docs), stats["tokens_saved"], stats["chunks_deduplicated"]
+    )
+    return context, stats
@@ -1,4 +1,7 @@
 import os
+import json
+import time
+import hashlib
 import logging
 import chromadb
 from pathlib import Path
@@ -13,102 +16,403 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 EMBED_MODEL = os.getenv("EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 SAVED_EMBED_PATH = os.getenv("SAVED_EMBED_PATH", "data/embeddedV1")
 DATA_PATH = os.getenv("DATA_PATH", "data/W3_Tutorials_All_txt")
+# "jsonl" = crawler section stream (the crawlers' default output), chunked by section (RAG/chunker.py)
+# "json"  = crawler course files in JSON_PATH, chunked by section
+# "txt"   = flattened files in DATA_PATH, split by token count
+SOURCE_FORMAT = os.getenv("SOURCE_FORMAT", "jsonl")
+JSON_PATH = os.getenv("JSON_PATH", "data/W3_Tutorials_All")
+SECTIONS_JSONL = os.getenv("SECTIONS_JSONL", "data/W3_Tutorials_All/sections.jsonl")  # shared with getData crawlers
+TEXT_MANIFEST = os.path.join(DATA_PATH, "manifest.json")  # written by getData/toText.py
 COLLECTION_NAME = "w3school_codes"
+TIKTOKEN_ENCODING = "gpt2"  # encoder used to measure chunk sizes
+CHUNK_SIZE = 384
+CHUNK_OVERLAP = 64
+INDEX_VERSION_FILE = os.path.join(SAVED_EMBED_PATH, "index_version.txt")
+CHECKPOINT_FILE = os.path.join(SAVED_EMBED_PATH, "index_checkpoint.json")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
 # ==================
 
 
-def embed(splits):
-    msg = "Embedding..."
-    logging.info(msg)
-    print(msg)
+def get_index_version() -> str:
+    """Return the marker written on the last vectorstore rebuild ("0" if none)."""
+    try:
+        with open(INDEX_VERSION_FILE, "r", encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
 
-    embedding = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    client = chromadb.PersistentClient(path=SAVED_EMBED_PATH)
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embedding,
-        client=client,
-        collection_name=COLLECTION_NAME,
-        persist_directory=SAVED_EMBED_PATH,
+
+def bump_index_version() -> str:
+    """Record that the vectorstore contents changed so dependent caches can invalidate."""
+    version = str(time.time_ns())
+    os.makedirs(SAVED_EMBED_PATH, exist_ok=True)
+    with open(INDEX_VERSION_FILE, "w", encoding="utf-8") as f:
+        f.write(version)
+    return version
+
+
+def get_text_splitter():
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        encoding_name=TIKTOKEN_ENCODING,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
     )
 
-    msg = f"✅ Vector store created and persisted at: {SAVED_EMBED_PATH}"
-    logging.info(msg)
-    print(msg)
-    return vectorstore
 
+def chunk_source(doc) -> list:
+    """Chunk one source Document: structured crawler output by section, flat text by token count."""
+    source_format = doc.metadata.get("source_format")
+    if source_format is None:
+        return get_text_splitter().split_documents([doc])
 
-def split(data):
-    msg = "Chunking..."
-    logging.info(msg)
-    print(msg)
+    from RAG import chunker  # imported here because chunker reads this module's config
+    data = json.loads(doc.page_content)
+    if source_format == "course":
+        return chunker.course_chunks(data, doc.metadata["source_file"])
+    return chunker.record_chunks(data, doc.metadata["source_file"])
 
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=384,
-        chunk_overlap=64,
-    )
-    return text_splitter.split_documents(data)
 
+def iter_documents(skip=frozenset()):
+    """Yield source Documents lazily from the configured SOURCE_FORMAT."""
+    if SOURCE_FORMAT == "json":
+        return iter_json_documents()
+    if SOURCE_FORMAT == "jsonl":
+        return iter_jsonl_documents()
+    return iter_txt_documents(skip)
 
-def loader():
-    msg = "Loading TXT data..."
-    logging.info(msg)
-    print(msg)
 
+def iter_txt_documents(skip=frozenset()):
+    """
+    Yield one Document per non-empty TXT file in DATA_PATH, reading files lazily.
+    Files named in `skip` are known to be unchanged and are not read at all.
+    """
     data_path = Path(DATA_PATH)
 
     if not data_path.exists():
         raise FileNotFoundError(f"{DATA_PATH} does not exist.")
 
-    all_docs = []
-
     # Iterate over TXT files
-    for txt_file in data_path.glob("*.txt"):
+    for txt_file in sorted(data_path.glob("*.txt")):
+        if txt_file.name in skip:
+            continue
         try:
             with open(txt_file, "r", encoding="utf-8") as f:
                 text = f.read().strip()
+        except Exception as e:
+            msg = f"❌ Failed to process {txt_file.name}: {e}"
+            logging.error(msg)
+            print(msg)
+            continue
 
-            if not text:
-                continue
+        if text:
+            yield Document(page_content=text, metadata={"source_file": txt_file.name})
 
-            metadata = {"source_file": txt_file.name}
-            all_docs.append(Document(page_content=text, metadata=metadata))
 
-            msg = f"✅ Processed {txt_file.name}, total docs so far: {len(all_docs)}"
-            logging.info(msg)
-            print(msg)
+def iter_json_documents():
+    """Yield one Document per course JSON file in JSON_PATH; its content is the raw JSON, chunked by chunk_source()."""
+    json_path = Path(JSON_PATH)
+
+    if not json_path.exists():
+        raise FileNotFoundError(f"{JSON_PATH} does not exist.")
 
+    for json_file in sorted(json_path.glob("*.json")):
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                text = f.read()
+            json.loads(text)
         except Exception as e:
-            msg = f"❌ Failed to process {txt_file.name}: {e}"
+            msg = f"❌ Failed to process {json_file.name}: {e}"
             logging.error(msg)
             print(msg)
+            continue
+
+        yield Document(page_content=text, metadata={"source_file": json_file.name, "source_format": "course"})
+
+
+def iter_stream_records(path: str = SECTIONS_JSONL):
+    """
+    Yield the latest record for every section (and every finished course) in the crawler's JSONL stream.
+    The first pass only remembers line offsets, so memory doesn't grow with section content;
+    a torn last line from a crawl that is still writing is skipped.
+    """
+    stream_path = Path(path)
+    if not stream_path.exists():
+        raise FileNotFoundError(f"{path} does not exist.")
+
+    latest = {}  # (course, index) -> offset of its last record
+    with open(stream_path, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if record and record.get("type") == "section":
+                latest[(record["course"], record["index"])] = offset
+            elif record and record.get("type") == "course":
+                latest[(record["course"], "overview")] = offset
+            offset += len(line)
+
+        for offset in sorted(latest.values()):
+            f.seek(offset)
+            yield json.loads(f.readline())
+
+
+def iter_jsonl_documents():
+    """Yield one Document per crawled section or course record, straight from the crawler's JSONL stream."""
+    for record in iter_stream_records():
+        key = record["index"] if record.get("type") == "section" else "overview"
+        yield Document(
+            page_content=json.dumps(record, sort_keys=True, ensure_ascii=False),
+            metadata={"source_file": f"{record['course']}#{key}", "source_format": "record"},
+        )
+
+
+def batch_search(vectorstore, queries: list, k: int = 5, where: dict = None) -> list:
+    """
+    Search the collection for several queries with one embedding call and one Chroma query.
+    Returns one ranked list of Documents per query, in query order.
+    """
+    if not queries:
+        return []
+
+    query_embeddings = vectorstore.embeddings.embed_documents(list(queries))
+    results = vectorstore._collection.query(
+        query_embeddings=query_embeddings,
+        n_results=k,
+        where=where,
+        include=["documents", "metadatas"],
+    )
+
+    ranked_lists = []
+    for ids, texts, metadatas in zip(results["ids"], results["documents"], results["metadatas"]):
+        ranked_lists.append([
+            Document(page_content=text, metadata=metadata or {}, id=doc_id)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        ])
+    return ranked_lists
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_chunks(doc, file_hash: str) -> tuple:
+    """
+    Split one file and give every chunk a stable id derived from its content.
+    Returns (ids, chunks) with source_file, file_hash and chunk_hash in each chunk's metadata.
+    """
+    ids, chunks, seen = [], [], {}
+    for chunk in chunk_source(doc):
+        chunk_hash = content_hash(chunk.page_content)
+        occurrence = seen.get(chunk_hash, 0)
+        seen[chunk_hash] = occurrence + 1
 
-    return all_docs
+        chunk.metadata.update({"file_hash": file_hash, "chunk_hash": chunk_hash})
+        ids.append(f"{doc.metadata['source_file']}:{chunk_hash[:32]}:{occurrence}")
+        chunks.append(chunk)
+    return ids, chunks
+
+
+def load_text_hashes() -> dict:
+    """
+    Return {txt name: content hash} from toText.py's manifest, for TXT files that still exist.
+    Empty when there is no manifest (e.g. TXT files maintained by hand).
+    """
+    try:
+        with open(TEXT_MANIFEST, "r", encoding="utf-8") as f:
+            files = json.load(f).get("files", {})
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {
+        name: entry["txt_hash"]
+        for name, entry in files.items()
+        if entry.get("txt_hash") and os.path.exists(os.path.join(DATA_PATH, name))
+    }
+
+
+def load_checkpoint() -> dict:
+    try:
+        with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_checkpoint(done: dict):
+    os.makedirs(SAVED_EMBED_PATH, exist_ok=True)
+    tmp_path = CHECKPOINT_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(done, f)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+
+def stored_sources(collection, page_size: int = 5000) -> set:
+    """Names of all source files with chunks in the collection, read a page of metadata at a time."""
+    sources, offset = set(), 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        sources.update((metadata or {}).get("source_file", "") for metadata in page["metadatas"])
+        if len(page["ids"]) < page_size:
+            return sources
+        offset += page_size
+
+
+def stored_ids(collection, source_file: str) -> set:
+    """Ids of one source file's stored chunks."""
+    return set(collection.get(where={"source_file": source_file}, include=[])["ids"])
+
+
+def index_incremental(vectorstore, batch_size: int = EMBED_BATCH_SIZE) -> dict:
+    """
+    Bring the vectorstore in line with the SOURCE_FORMAT sources, embedding only what changed.
+    Files stream through load -> split -> embed -> upsert; new chunks are embedded
+    in batches of `batch_size`, so memory stays flat with corpus size.
+    - files whose content hash matches the checkpointed file_hash are skipped
+      (without reading them when toText.py's manifest vouches for the hash)
+    - changed files are re-split; only chunks with new ids are embedded,
+      chunks that disappeared are deleted
+    - chunks of files no longer in the sources are deleted
+    A file is recorded in CHECKPOINT_FILE only once all of its chunks are upserted,
+    so an interrupted run resumes where it stopped and never trusts a half-indexed file.
+    Returns a report of what changed.
+    """
+    collection = vectorstore._collection
+    existing = stored_sources(collection)  # chunk ids are only fetched per file, when it changed
+
+    checkpoint = load_checkpoint()  # source_file -> file_hash of fully indexed files
+
+    report = {
+        "files_added": [], "files_changed": [], "files_removed": [], "files_unchanged": 0,
+        "chunks_added": 0, "chunks_removed": 0, "chunks_kept": 0,
+    }
+
+    pending = {}  # source_file -> file waiting for its new chunks to be upserted
+    batch_ids, batch_chunks = [], []
+    start = time.perf_counter()
+
+    def finish_file(source_file):
+        entry = pending.pop(source_file)
+        if entry["kept"]:
+            # Only the file hash moved on; update metadata without re-embedding
+            collection.update(ids=[i for i, _ in entry["kept"]], metadatas=[c.metadata for _, c in entry["kept"]])
+        if entry["removed"]:
+            collection.delete(ids=entry["removed"])
+        checkpoint[source_file] = entry["file_hash"]
+        save_checkpoint(checkpoint)
+
+    def flush():
+        if not batch_ids:
+            return
+        batch_start = time.perf_counter()
+        vectorstore.add_documents(list(batch_chunks), ids=list(batch_ids))
+        report["chunks_added"] += len(batch_ids)
+
+        msg = (
+            f"✅ Upserted {len(batch_ids)} chunks in {time.perf_counter() - batch_start:.1f}s "
+            f"({len(batch_ids) / max(time.perf_counter() - batch_start, 1e-9):.1f} chunks/sec, "
+            f"{report['chunks_added'] / max(time.perf_counter() - start, 1e-9):.1f} chunks/sec overall)"
+        )
+        logging.info(msg)
+        print(msg)
+
+        for chunk in batch_chunks:
+            source_file = chunk.metadata["source_file"]
+            pending[source_file]["remaining"] -= 1
+            if pending[source_file]["remaining"] == 0:
+                finish_file(source_file)
+        batch_ids.clear()
+        batch_chunks.clear()
+
+    # toText.py's manifest already knows each TXT's hash, so unchanged files aren't even read
+    text_hashes = load_text_hashes() if SOURCE_FORMAT == "txt" else {}
+    unchanged = {
+        name for name, txt_hash in text_hashes.items()
+        if name in existing and checkpoint.get(name) == txt_hash
+    }
+    report["files_unchanged"] += len(unchanged)
+
+    on_disk = set(unchanged)
+    for doc in iter_documents(skip=unchanged):
+        source_file = doc.metadata["source_file"]
+        on_disk.add(source_file)
+        file_hash = content_hash(doc.page_content)
+        previous = source_file in existing
+
+        if previous and checkpoint.get(source_file) == file_hash:
+            report["files_unchanged"] += 1
+            continue
+
+        ids, chunks = hash_chunks(doc, file_hash)
+        old_ids = stored_ids(collection, source_file) if previous else set()
+
+        new = [(i, c) for i, c in zip(ids, chunks) if i not in old_ids]
+        pending[source_file] = {
+            "file_hash": file_hash,
+            "remaining": len(new),
+            "kept": [(i, c) for i, c in zip(ids, chunks) if i in old_ids],
+            "removed": list(old_ids - set(ids)),
+        }
+        report["files_changed" if previous else "files_added"].append(source_file)
+        report["chunks_kept"] += len(pending[source_file]["kept"])
+        report["chunks_removed"] += len(pending[source_file]["removed"])
+
+        if not new:
+            finish_file(source_file)
+        for i, c in new:
+            batch_ids.append(i)
+            batch_chunks.append(c)
+            if len(batch_ids) >= batch_size:
+                flush()
+    flush()
+
+    for source_file in existing - on_disk:
+        old_ids = stored_ids(collection, source_file)
+        if old_ids:
+            collection.delete(ids=list(old_ids))
+            checkpoint.pop(source_file, None)
+            report["files_removed"].append(source_file)
+            report["chunks_removed"] += len(old_ids)
+
+    if report["files_removed"]:
+        save_checkpoint(checkpoint)
+    if report["files_added"] or report["files_changed"] or report["files_removed"]:
+        bump_index_version()
+
+    msg = (
+        f"✅ Index updated: {len(report['files_added'])} added, {len(report['files_changed'])} changed, "
+        f"{len(report['files_removed'])} removed, {report['files_unchanged']} unchanged files | "
+        f"chunks +{report['chunks_added']} -{report['chunks_removed']} ={report['chunks_kept']} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+    logging.info(msg)
+    print(msg)
+    return report
 
 
 def get_vectorstore(create_new_vectorstore: bool = True):
     embedding = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    client = chromadb.PersistentClient(path=SAVED_EMBED_PATH)
+    vectorstore = Chroma(
+        client=client,
+        collection_name=COLLECTION_NAME,
+        embedding_function=embedding,
+    )
+
     if not create_new_vectorstore:
         msg = "Vectorstore found. Loading existing..."
         logging.info(msg)
         print(msg)
-
-        client = chromadb.PersistentClient(path=SAVED_EMBED_PATH)
-        return Chroma(
-            client=client,
-            collection_name=COLLECTION_NAME,
-            embedding_function=embedding,
-        )
+        return vectorstore
     else:
-        msg = "No existing vectorstore found. Creating a new one..."
+        msg = "Updating vectorstore incrementally..."
         logging.info(msg)
         print(msg)
 
-        data = loader()
-        splits = split(data)
-        return embed(splits)
+        index_incremental(vectorstore)
+        return vectorstore
 
 
 if __name__ == "__main__":
-    # Run once to create and persist vectorstore
+    # Create the vectorstore, or re-embed only what changed since the last run
     get_vectorstore(create_new_vectorstore=True)
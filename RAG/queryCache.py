@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+# ===== CONFIG =====
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH", "data/query_cache.json")
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1000"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+# ==================
+
+# Words that change the phrasing of a learner question but not what should be retrieved.
+# Not "for"/"on": they are keywords and glossary terms in programming questions ("for loop").
+FILLER_WORDS = {
+    "me", "please", "pls", "a", "an", "the", "can", "could", "would", "you", "i",
+    "want", "need", "some", "give", "show", "tell", "about", "us",
+}
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and filler words so near-identical questions share a key."""
+    words = re.sub(r"[^\w\s+#.-]", " ", question.lower()).split()
+    kept = [w.strip(".") for w in words if w not in FILLER_WORDS]
+    return " ".join(w for w in kept if w) or question.strip().lower()
+
+
+class QueryCache:
+    """
+    LRU cache of generated retrieval queries, persisted to a JSON file.
+    Entries are keyed on the normalized question and the number of queries,
+    and expire after `ttl` seconds.
+    """
+
+    def __init__(self, path: str = QUERY_CACHE_PATH, max_entries: int = QUERY_CACHE_MAX_ENTRIES,
+                 ttl: float = QUERY_CACHE_TTL):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(question: str, num_query: int) -> str:
+        return f"{num_query}|{normalize_question(question)}"
+
+    def get(self, question: str, num_query: int) -> Optional[List[str]]:
+        key = self.make_key(question, num_query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry["created"] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return list(entry["queries"])
+
+    def put(self, question: str, num_query: int, queries: List[str]):
+        if not queries:
+            return
+        key = self.make_key(question, num_query)
+        with self._lock:
+            self._entries[key] = {"queries": list(queries), "created": time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logging.warning("Ignoring unreadable query cache %s: %s", self.path, e)
+            return
+
+        now = time.time()
+        for key, entry in data.items():
+            if now - entry.get("created", 0) <= self.ttl:
+                self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logging.warning("Failed to persist query cache %s: %s", self.path, e)
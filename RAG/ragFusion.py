@@ -1,9 +1,17 @@
+import hashlib
 import logging
-from typing import List, Tuple, Any
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import List, Tuple, Any, Optional
 
 from langchain.prompts import ChatPromptTemplate
-from langchain.load import dumps, loads
 import LLM 
+from RAG import embedding
+from RAG.queryCache import QueryCache
+from RAG.contextAssembler import assemble_context
+from RAG.topicRouter import route_filter
+from RAG.reranker import rerank, RERANK_TOP_N
 
 # Configure logging
 logging.basicConfig(
@@ -14,6 +22,25 @@ logging.basicConfig(
 # Constants
 NUM_QUERY = 4
 TOP_K = 30
+RRF_K = int(os.getenv("RRF_K", "5"))
+
+# Retrieval strategy
+BATCHED_RETRIEVAL = os.getenv("BATCHED_RETRIEVAL", "true").lower() == "true"
+CONCURRENT_RETRIEVAL = os.getenv("CONCURRENT_RETRIEVAL", "true").lower() == "true"
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "8"))
+RETRIEVAL_TIMEOUT = float(os.getenv("RETRIEVAL_TIMEOUT", "5.0"))  # seconds, per query
+
+# HyDE: also retrieve with a hypothetical answer, generated in parallel with the query variants
+USE_HYDE = os.getenv("USE_HYDE", "false").lower() == "true"
+HYDE_WEIGHT = float(os.getenv("HYDE_WEIGHT", "1.0"))  # RRF weight of the HyDE ranked list
+
+# Generated queries are reused across turns and restarts
+query_cache = QueryCache()
+
+# Shared pool so a lookup that overruns its timeout never blocks the caller on shutdown
+_retrieval_pool = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="rag-retrieval")
+# Side LLM calls (HyDE) that run while the caller generates the query variants
+_generation_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-generation")
 
 
 def generate_query(question: str, num_query: int = NUM_QUERY) -> List[str]:
@@ -21,6 +48,11 @@ def generate_query(question: str, num_query: int = NUM_QUERY) -> List[str]:
     Generate multiple pseudo-queries for RAG.
     For tutorials/documents, queries should be variations of the user's question.
     """
+    cached = query_cache.get(question, num_query)
+    if cached is not None:
+        logging.info("Query cache hit for question: %s", question)
+        return cached
+
     logging.info("Generating RAG queries for question: %s", question)
 
     template = (
@@ -38,16 +70,18 @@ def generate_query(question: str, num_query: int = NUM_QUERY) -> List[str]:
         question=question,
         num_query=num_query
     )
-    raw_output = LLM.run_llm(prompt, question)
-
-    raw_output = LLM.run_llm(prompt, question)
+    raw_output = LLM.run_llm(prompt, question, profile="expansion")
 
     # Ensure raw_output is string
     if not isinstance(raw_output, str):
         raw_output = "".join(raw_output)
 
-    queries = [line.strip() for line in raw_output.splitlines() if line.strip()]
-    return queries[:num_query]
+    queries = [line.strip() for line in raw_output.splitlines() if line.strip()][:num_query]
+
+    # Don't cache Groq failures, they come back as a single error line
+    if queries and not raw_output.startswith("⚠️"):
+        query_cache.put(question, num_query, queries)
+    return queries
 
 
 def generate_hyde_document(question: str) -> str:
@@ -64,62 +98,273 @@ def generate_hyde_document(question: str) -> str:
         "Hypothetical Answer:"
     )
     prompt = ChatPromptTemplate.from_template(template).format(question=question)
-    return LLM.run_llm(prompt, question).strip()
+    output = "".join(LLM.run_llm(prompt, question, profile="hyde")).strip()
+
+    # A Groq failure comes back as an error line; retrieving with it would only add noise
+    if output.startswith("⚠️"):
+        logging.warning("HyDE generation failed: %s", output)
+        return ""
+    return output
+
+
+def expand_question(question: str, use_hyde: bool = USE_HYDE) -> Tuple[List[str], str]:
+    """
+    Generate the query variants and, with `use_hyde`, a hypothetical answer document.
+    Both LLM calls run at the same time, so HyDE adds no extra round trip.
+    Returns (queries, hyde_document); the document is "" when HyDE is off or failed.
+    """
+    if not use_hyde:
+        return generate_query(question), ""
+
+    hyde_future = _generation_pool.submit(generate_hyde_document, question)
+    queries = generate_query(question)
+    try:
+        hyde_document = hyde_future.result()
+    except Exception as err:
+        logging.error("HyDE generation error: %s", err)
+        hyde_document = ""
+    return queries, hyde_document
+
+
+def doc_key(doc: Any) -> str:
+    """
+    Stable identity for a retrieved chunk: the Chroma id when the store returned one,
+    otherwise a hash of the source file and chunk text.
+    """
+    doc_id = getattr(doc, "id", None)
+    if doc_id:
+        return doc_id
+    source = doc.metadata.get("source_file", "")
+    return hashlib.sha1(f"{source}\0{doc.page_content}".encode("utf-8")).hexdigest()
 
 
 def reciprocal_rank_fusion(
     ranked_lists: List[List[Any]],
-    k: int = 5
+    k: int = RRF_K,
+    weights: Optional[List[float]] = None
 ) -> List[Tuple[Any, float]]:
     """
-    Perform Reciprocal Rank Fusion on multiple ranked document lists.
+    Perform (weighted) Reciprocal Rank Fusion on multiple ranked document lists.
+    Documents are matched by `doc_key` and the first retrieved object is kept as is.
     Returns a list of (document, fused_score) sorted by score descending.
     """
+    if weights is None:
+        weights = [1.0] * len(ranked_lists)
+
+    docs = {}
     scores = {}
-    for results in ranked_lists:
+    for results, weight in zip(ranked_lists, weights):
         for rank, doc in enumerate(results):
-            key = dumps(doc)
-            scores.setdefault(key, 0.0)
-            scores[key] += 1.0 / (rank + k)
+            key = doc_key(doc)
+            if key not in docs:
+                docs[key] = doc
+                scores[key] = 0.0
+            scores[key] += weight / (rank + k)
 
-    fused = [(loads(key), score) for key, score in scores.items()]
+    fused = [(docs[key], score) for key, score in scores.items()]
     fused.sort(key=lambda x: x[1], reverse=True)
     return fused
 
 
-def rag_fusion_chain(question: str, retriever: Any, top_k: int = TOP_K) -> Tuple[str, List[str]]:
+def retrieve_sequential(queries: List[str], retriever: Any) -> List[List[Any]]:
+    """
+    Retrieve documents for each query one after another.
+    Returns one ranked list per query that succeeded, in query order.
+    """
+    ranked_lists = []
+    for q in queries:
+        try:
+            ranked_lists.append(retriever.invoke(q))
+        except Exception as err:
+            logging.error("Retrieval error for '%s': %s", q, err)
+    return ranked_lists
+
+
+def retrieve_concurrent(
+    queries: List[str],
+    retriever: Any,
+    timeout: float = RETRIEVAL_TIMEOUT
+) -> List[List[Any]]:
+    """
+    Send all queries to the vectorstore at once through the shared thread pool.
+    Every query gets `timeout` seconds from submission; lookups that fail or overrun
+    are dropped so one slow query can't stall the whole turn.
+    Returns one ranked list per query that succeeded, in query order.
+    """
+    start = time.perf_counter()
+    futures = [_retrieval_pool.submit(retriever.invoke, q) for q in queries]
+    wait(futures, timeout=timeout)
+
+    ranked_lists = []
+    for q, future in zip(queries, futures):
+        if not future.done():
+            future.cancel()
+            logging.warning("Retrieval timed out after %.1fs for '%s'", timeout, q)
+            continue
+        try:
+            ranked_lists.append(future.result())
+        except Exception as err:
+            logging.error("Retrieval error for '%s': %s", q, err)
+
+    logging.info(
+        "Retrieved %d/%d queries concurrently in %.3fs",
+        len(ranked_lists), len(queries), time.perf_counter() - start
+    )
+    return ranked_lists
+
+
+def retrieve_batched(
+    queries: List[str],
+    retriever: Any,
+    where: Optional[dict] = None,
+    timeout: float = RETRIEVAL_TIMEOUT
+) -> List[List[Any]]:
+    """
+    Embed all queries in a single model call and run one multi-query search
+    against the retriever's Chroma collection, restricted by `where` if given.
+    The search runs on the shared pool and gets `timeout` seconds; if it overruns,
+    nothing is returned so a slow store can't stall the whole turn.
+    Returns one ranked list per query, in query order.
+    """
+    start = time.perf_counter()
+    k = retriever.search_kwargs.get("k", 4)
+    future = _retrieval_pool.submit(embedding.batch_search, retriever.vectorstore, queries, k=k, where=where)
+    try:
+        ranked_lists = future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        logging.warning("Batched retrieval timed out after %.1fs for %d queries", timeout, len(queries))
+        return []
+    logging.info("Retrieved %d queries in one batch in %.3fs", len(queries), time.perf_counter() - start)
+    return ranked_lists
+
+
+def filtered_retriever(retriever: Any, where: Optional[dict]) -> Any:
+    """A copy of the retriever whose searches are restricted by the Chroma `where` filter."""
+    if not where or not hasattr(retriever, "vectorstore"):
+        return retriever
+    return retriever.vectorstore.as_retriever(search_kwargs={**retriever.search_kwargs, "filter": where})
+
+
+def retrieve(queries: List[str], retriever: Any, where: Optional[dict] = None) -> List[List[Any]]:
+    """
+    Retrieve one ranked list per query using the fastest available strategy:
+    batched search when the retriever wraps a Chroma vectorstore, otherwise
+    concurrent (or sequential) retriever calls. `where` restricts the search
+    to matching chunk metadata (e.g. the courses picked by the topic router).
+    """
+    if BATCHED_RETRIEVAL and hasattr(retriever, "vectorstore"):
+        try:
+            return retrieve_batched(queries, retriever, where)
+        except Exception as err:
+            logging.error("Batched retrieval failed, falling back to per-query retrieval: %s", err)
+
+    retriever = filtered_retriever(retriever, where)
+    if CONCURRENT_RETRIEVAL:
+        return retrieve_concurrent(queries, retriever)
+    return retrieve_sequential(queries, retriever)
+
+
+def record_chunks(trace: Optional[dict], docs: List[Any], scores: Optional[dict] = None):
+    """Note the chunks that made it into the context (id, source, fused score) in the trace."""
+    if trace is None:
+        return
+    scores = scores or {}
+    trace["chunk_ids"] = [doc_key(doc) for doc in docs]
+    trace["chunks"] = [
+        {"id": key, "source": doc.metadata.get("source_file", ""), "score": scores.get(key)}
+        for key, doc in zip(trace["chunk_ids"], docs)
+    ]
+
+
+def fast_context(question: str, retriever: Any, trace: Optional[dict] = None) -> str:
+    """
+    Speculative context: one vector lookup on the raw question, no query expansion,
+    fusion or reranking, so an answer can start streaming while the full chain runs.
+    """
+    timings = {}
+    start = time.perf_counter()
+    where = route_filter(question)
+    ranked_lists = retrieve([question], retriever, where)
+    if where and not any(ranked_lists):
+        ranked_lists = retrieve([question], retriever)
+    docs = (ranked_lists[0] if ranked_lists else [])[:RERANK_TOP_N]
+    timings["retrieval"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    context, stats = assemble_context(docs)
+    timings["assembly"] = time.perf_counter() - start
+
+    if trace is not None:
+        trace.update({"mode": "fast", "queries": [question], "where": where, "timings": timings, "context": stats})
+        record_chunks(trace, docs)
+    return context
+
+
+def rag_fusion_chain(
+    question: str,
+    retriever: Any,
+    top_k: int = TOP_K,
+    trace: Optional[dict] = None
+) -> Tuple[str, List[str]]:
     """
     Execute a RAG fusion chain for tutorial chatbot:
-    1. Generate diverse queries
-    2. Retrieve documents per query
-    3. Apply Reciprocal Rank Fusion (RRF)
-    4. Return fused context and used queries
+    1. Generate diverse queries (and a HyDE document, in parallel, with USE_HYDE)
+    2. Retrieve documents per query (pre-filtered to the routed courses)
+    3. Apply Reciprocal Rank Fusion (RRF), the HyDE list weighted by HYDE_WEIGHT
+    4. Rerank the fused chunks within a latency budget
+    5. Assemble a deduplicated, token-budgeted context
+    6. Return fused context and used queries
+    If `trace` is given, it is filled with the queries, chosen chunks and per-step timings.
     """
+    timings = {}
     try:
         logging.info("Starting RAG fusion chain for question: %s", question)
 
-        # Step 1: Generate retrieval queries
-        queries = generate_query(question)
+        # Step 1: Generate retrieval queries (and the HyDE document alongside them)
+        start = time.perf_counter()
+        queries, hyde_document = expand_question(question)
+        timings["expansion"] = time.perf_counter() - start
         logging.info("Generated queries: %s", queries)
 
-        # Step 2: Retrieve documents per query
-        ranked_lists = []
-        for q in queries:
-            try:
-                results = retriever.invoke(q)
-                ranked_lists.append(results)
-            except Exception as err:
-                logging.error("Retrieval error for '%s': %s", q, err)
+        # Step 2: Retrieve documents per query, within the routed courses when the topic is clear.
+        # The HyDE document is searched as one more query, embedded in the same batch.
+        start = time.perf_counter()
+        search_texts = queries + ([hyde_document] if hyde_document else [])
+        where = route_filter(question)
+        ranked_lists = retrieve(search_texts, retriever, where)
+        if where and not any(ranked_lists):
+            logging.info("Nothing found within %s, searching all courses", where)
+            ranked_lists = retrieve(search_texts, retriever)
+        timings["retrieval"] = time.perf_counter() - start
 
         # Step 3: Fuse and rank
-        fused = reciprocal_rank_fusion(ranked_lists)
+        start = time.perf_counter()
+        weights = [1.0] * len(ranked_lists)
+        if hyde_document and len(ranked_lists) == len(search_texts):
+            weights[-1] = HYDE_WEIGHT
+        fused = reciprocal_rank_fusion(ranked_lists, weights=weights)
+        timings["fusion"] = time.perf_counter() - start
+
+        # Step 4: Rerank the top-K fused chunks against the question and keep the best few
+        start = time.perf_counter()
+        candidates = [doc for doc, _ in fused[:top_k]]
+        candidates = rerank(question, candidates, getattr(retriever, "vectorstore", None))
+        timings["rerank"] = time.perf_counter() - start
 
-        # Step 4: Extract top-K contents
-        top_docs = [doc.page_content for doc, _ in fused[:top_k]]
-        context = "\n\n".join(top_docs)
+        # Step 5: Assemble them within the token budget
+        start = time.perf_counter()
+        context, stats = assemble_context(candidates)
+        timings["assembly"] = time.perf_counter() - start
 
+        if trace is not None:
+            trace.update({"mode": "fusion", "queries": queries, "hyde": bool(hyde_document), "where": where,
+                          "timings": timings, "context": stats})
+            record_chunks(trace, candidates, {doc_key(doc): score for doc, score in fused[:top_k]})
         return context, queries
 
     except Exception as e:
         logging.exception("Error in rag_fusion_chain: %s", e)
+        if trace is not None:
+            trace.update({"mode": "fusion", "error": str(e), "timings": timings})
         return "", []
@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from typing import Any, List
+
+import numpy as np
+
+# ===== CONFIG =====
+# "cosine"        = re-score fused chunks against the question using their stored embeddings
+# "cross-encoder" = score (question, chunk) pairs with a small CPU cross-encoder
+# "off"           = keep the fused order and TOP_K chunks
+RERANK_MODE = os.getenv("RERANK_MODE", "cosine")
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "5"))
+RERANK_BUDGET = float(os.getenv("RERANK_BUDGET", "0.3"))  # seconds; the fused order is kept past this
+CROSS_ENCODER_MODEL = os.getenv("CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+# ==================
+
+# Reranking runs here so the caller can stop waiting once the budget is spent.
+# An overrun can't be cancelled once started, so new requests skip reranking while all workers are busy.
+RERANK_WORKERS = 2
+_rerank_pool = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rag-rerank")
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def get_cross_encoder():
+    from sentence_transformers import CrossEncoder  # optional dependency, only for RERANK_MODE=cross-encoder
+    return CrossEncoder(CROSS_ENCODER_MODEL, device="cpu")
+
+
+def cross_encoder_ready() -> bool:
+    return get_cross_encoder.cache_info().currsize > 0
+
+
+def warm_cross_encoder():
+    """Load the cross-encoder in the background, outside any request's rerank budget."""
+    def load():
+        start = time.perf_counter()
+        try:
+            get_cross_encoder()
+            logging.info("Cross-encoder %s loaded in %.1fs", CROSS_ENCODER_MODEL, time.perf_counter() - start)
+        except Exception as err:
+            logging.error("Could not load cross-encoder %s: %s", CROSS_ENCODER_MODEL, err)
+
+    threading.Thread(target=load, name="rag-rerank-warmup", daemon=True).start()
+
+
+def _task_done(_future):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight -= 1
+
+
+def submit(fn, *args):
+    """Submit a scoring task, or return None when every rerank worker is still busy."""
+    global _in_flight
+    with _in_flight_lock:
+        if _in_flight >= RERANK_WORKERS:
+            return None
+        _in_flight += 1
+    future = _rerank_pool.submit(fn, *args)
+    future.add_done_callback(_task_done)
+    return future
+
+
+def cosine_scores(question: str, docs: List[Any], vectorstore: Any) -> np.ndarray:
+    """
+    Cosine similarity of each chunk to the question, in one vectorized pass.
+    Stored embeddings are fetched from Chroma by id; only chunks without one are re-embedded.
+    """
+    query = np.asarray(vectorstore.embeddings.embed_query(question), dtype=np.float32)
+
+    ids = [getattr(doc, "id", None) for doc in docs]
+    stored = {}
+    known = [i for i in ids if i]
+    if known:
+        result = vectorstore._collection.get(ids=known, include=["embeddings"])
+        stored = dict(zip(result["ids"], result["embeddings"]))
+
+    missing = [n for n, i in enumerate(ids) if i not in stored]
+    vectors = [stored.get(i) for i in ids]
+    if missing:
+        embedded = vectorstore.embeddings.embed_documents([docs[n].page_content for n in missing])
+        for n, vector in zip(missing, embedded):
+            vectors[n] = vector
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    return matrix @ query / np.maximum(norms, 1e-12)
+
+
+def cross_encoder_scores(question: str, docs: List[Any]) -> np.ndarray:
+    return np.asarray(get_cross_encoder().predict([(question, doc.page_content) for doc in docs]))
+
+
+def rerank(question: str, docs: List[Any], vectorstore: Any = None,
+           top_n: int = RERANK_TOP_N, budget: float = RERANK_BUDGET) -> List[Any]:
+    """
+    Re-score fused chunks against the question and keep the best `top_n`.
+    Scoring gets `budget` seconds; if it fails or overruns, the fused order is kept
+    (still cut to `top_n`) so reranking never adds more than the budget to a turn.
+    """
+    if RERANK_MODE == "off" or not docs:
+        return docs
+    if RERANK_MODE == "cosine" and vectorstore is None:
+        return docs[:top_n]
+
+    if RERANK_MODE == "cross-encoder" and not cross_encoder_ready():
+        logging.warning("Cross-encoder not loaded yet, keeping fused order")
+        return docs[:top_n]
+
+    start = time.perf_counter()
+    if RERANK_MODE == "cross-encoder":
+        future = submit(cross_encoder_scores, question, docs)
+    else:
+        future = submit(cosine_scores, question, docs, vectorstore)
+    if future is None:
+        logging.warning("Rerank workers busy with overrunning requests, keeping fused order")
+        return docs[:top_n]
+
+    try:
+        scores = future.result(timeout=budget)
+    except FutureTimeout:
+        future.cancel()
+        logging.warning("Reranking overran its %.2fs budget, keeping fused order", budget)
+        return docs[:top_n]
+    except Exception as err:
+        logging.error("Reranking failed, keeping fused order: %s", err)
+        return docs[:top_n]
+
+    # Stable sort: equal scores keep their fused rank
+    order = sorted(range(len(docs)), key=lambda n: -scores[n])[:top_n]
+    logging.info("Reranked %d chunks to %d in %.3fs (%s)", len(docs), len(order), time.perf_counter() - start, RERANK_MODE)
+    return [docs[n] for n in order]
+
+
+if RERANK_MODE == "cross-encoder":
+    warm_cross_encoder()
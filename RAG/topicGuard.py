@@ -0,0 +1,111 @@
+import difflib
+import logging
+import os
+import threading
+from typing import List, Optional
+
+from RAG.queryCache import normalize_question
+from RAG.topicRouter import get_router
+
+# ===== CONFIG =====
+TOPIC_GUARD = os.getenv("TOPIC_GUARD", "true").lower() == "true"
+UNSUPPORTED_FILE = os.path.join("topics", "unsupported_topics.txt")
+UNSUPPORTED_MESSAGE = "❌ Sorry, this topic is not supported yet. Please wait for an update."
+TYPO_CUTOFF = 0.8        # difflib ratio for a word to count as a misspelling of another
+QUESTION_CUTOFF = 0.9    # difflib ratio for a whole question to match a logged one
+MIN_KEYWORD_LENGTH = 3
+# Request words that say what the learner wants, not which topic
+GENERIC_WORDS = {
+    "teach", "tutorial", "tutorials", "full", "complete", "lang", "language", "languages", "learn",
+    "learning", "explain", "make", "write", "create", "exercise", "exercises", "beginner", "beginners",
+    "how", "what", "why", "when", "which", "is", "are", "do", "does", "use", "using", "course", "lesson",
+    "lessons", "guide", "intro", "introduction", "basics", "basic", "example", "examples", "code", "with",
+    "in", "of", "to", "and", "or", "my", "it", "this", "that", "start", "started", "programming",
+}
+# ==================
+
+
+def is_generic(word: str) -> bool:
+    return word in GENERIC_WORDS or bool(difflib.get_close_matches(word, GENERIC_WORDS, n=1, cutoff=TYPO_CUTOFF))
+
+
+class TopicGuard:
+    """
+    Pre-flight check that rejects questions about topics already known to be unsupported,
+    before any LLM or vectorstore call.
+    A question is rejected only when it matches the logged unsupported list (exactly, by a
+    typo-tolerant topic word, or as a near-identical question) and nothing in it, typos
+    included, points at a course in the catalog. Everything else goes through the normal pipeline.
+    """
+
+    def __init__(self, unsupported_file: str = UNSUPPORTED_FILE):
+        self.unsupported_file = unsupported_file
+        self._mtime = None
+        self._questions = set()   # normalized logged questions
+        self._keywords = set()    # topic words of logged questions
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Reload the unsupported list when app.log_unsupported has appended to it."""
+        try:
+            mtime = os.path.getmtime(self.unsupported_file)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+
+        questions, keywords = set(), set()
+        if mtime is not None:
+            with open(self.unsupported_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    normalized = normalize_question(line) if line.strip() else ""
+                    if not normalized:
+                        continue
+                    questions.add(normalized)
+                    keywords.update(
+                        w for w in normalized.split() if len(w) >= MIN_KEYWORD_LENGTH and not is_generic(w)
+                    )
+        self._questions, self._keywords, self._mtime = questions, keywords, mtime
+
+    def unsupported_match(self, words: List[str]) -> Optional[str]:
+        """The logged keyword or question this one matches, if any."""
+        for word in words:
+            if word in self._keywords:
+                return word
+            if len(word) < MIN_KEYWORD_LENGTH or is_generic(word):
+                continue
+            close = difflib.get_close_matches(word, self._keywords, n=1, cutoff=TYPO_CUTOFF)
+            if close:
+                return close[0]
+        close = difflib.get_close_matches(" ".join(words), self._questions, n=1, cutoff=QUESTION_CUTOFF)
+        return close[0] if close else None
+
+    @staticmethod
+    def catalog_match(words: List[str]) -> bool:
+        """True if any word (or a close misspelling of one) is a course name or glossary term."""
+        router = get_router()
+        if router.scores(" ".join(words)):
+            return True
+        vocabulary = {w for term in router.index for w in term.split()}
+        return any(
+            difflib.get_close_matches(w, vocabulary, n=1, cutoff=TYPO_CUTOFF)
+            for w in words if len(w) >= MIN_KEYWORD_LENGTH and not is_generic(w)
+        )
+
+    def is_unsupported(self, question: str) -> bool:
+        if not TOPIC_GUARD:
+            return False
+        words = normalize_question(question).split()
+        if not words:
+            return False
+
+        with self._lock:
+            self._refresh()
+            match = self.unsupported_match(words)
+        if match is None:
+            return False
+        if self.catalog_match(words):
+            return False
+
+        logging.info("Rejected unsupported topic '%s' (matched '%s')", question, match)
+        return True
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from RAG import embedding
+from RAG.queryCache import normalize_question
+
+# ===== CONFIG =====
+TOPIC_ROUTING = os.getenv("TOPIC_ROUTING", "true").lower() == "true"
+COURSE_NAME_WEIGHT = 3.0  # a course named in the question is strong evidence
+GLOSSARY_WEIGHT = 1.0     # split between all courses sharing the term
+ROUTE_MIN_SCORE = float(os.getenv("ROUTE_MIN_SCORE", "2.0"))  # below this the search stays global
+ROUTE_MAX_COURSES = int(os.getenv("ROUTE_MAX_COURSES", "2"))
+ROUTE_MARGIN = 0.5  # other courses are kept when they score at least this fraction of the best one
+# Words in course names that say nothing about the topic
+GENERIC_NAME_WORDS = {"learn", "tutorial", "tutorials", "home", "intro", "introduction", "get", "started", "course"}
+# ==================
+
+
+def terms(text: str) -> List[str]:
+    """Unigrams and bigrams of the normalized text."""
+    words = normalize_question(text).split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class TopicRouter:
+    """
+    In-memory keyword index from course names and glossary terms to courses.
+    route() maps a question to the courses it is about, or [] when it can't tell,
+    so retrieval can restrict the search with a `where` filter on course metadata.
+    """
+
+    def __init__(self, courses: Dict[str, List[str]]):
+        self.courses = sorted(courses)
+        self.index = defaultdict(dict)  # term -> {course: weight}
+
+        holders = defaultdict(set)
+        for course, glossary in courses.items():
+            for term in glossary:
+                holders[" ".join(normalize_question(term).split())].add(course)
+        for term, owners in holders.items():
+            for course in owners:
+                self.index[term][course] = GLOSSARY_WEIGHT / len(owners)
+
+        # The full course name, and each topical word of it split between the courses sharing it
+        name_words = defaultdict(set)
+        for course in courses:
+            name = " ".join(normalize_question(course).split())
+            if name:
+                self.index[name][course] = COURSE_NAME_WEIGHT
+            for word in set(name.split()) - GENERIC_NAME_WORDS - {name}:
+                name_words[word].add(course)
+        for word, owners in name_words.items():
+            for course in owners:
+                weight = COURSE_NAME_WEIGHT / len(owners)
+                self.index[word][course] = max(self.index[word].get(course, 0.0), weight)
+
+    @classmethod
+    def from_sources(cls) -> "TopicRouter":
+        """Build the index from the crawler output the vectorstore was built from."""
+        courses = {}
+        if embedding.SOURCE_FORMAT == "jsonl":
+            for record in embedding.iter_stream_records():
+                if record.get("type") == "course":
+                    courses[record["course"]] = record.get("glossary", [])
+        else:
+            for json_file in sorted(Path(embedding.JSON_PATH).glob("*.json")):
+                try:
+                    with open(json_file, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    logging.warning("Topic router skipped %s: %s", json_file.name, e)
+                    continue
+                courses[data.get("course_name") or json_file.name] = data.get("glossary", [])
+
+        logging.info("Topic router indexed %d courses", len(courses))
+        return cls(courses)
+
+    def scores(self, question: str) -> Dict[str, float]:
+        scores = defaultdict(float)
+        for term in set(terms(question)):
+            for course, weight in self.index.get(term, {}).items():
+                scores[course] += weight
+        return dict(scores)
+
+    def route(self, question: str) -> List[str]:
+        """Courses the question is about, best first; [] when routing is uncertain."""
+        ranked = sorted(self.scores(question).items(), key=lambda x: x[1], reverse=True)
+        if not ranked or ranked[0][1] < ROUTE_MIN_SCORE:
+            return []
+        best = ranked[0][1]
+        return [course for course, score in ranked[:ROUTE_MAX_COURSES] if score >= best * ROUTE_MARGIN]
+
+
+def course_filter(courses: List[str]) -> Optional[dict]:
+    """Chroma `where` clause restricting a search to the given courses."""
+    if not courses:
+        return None
+    if len(courses) == 1:
+        return {"course": courses[0]}
+    return {"course": {"$in": list(courses)}}
+
+
+_router = None
+_router_version = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> TopicRouter:
+    """Shared router, rebuilt when the vectorstore's index version changes."""
+    global _router, _router_version
+    version = embedding.get_index_version()
+    with _router_lock:
+        if _router is None or version != _router_version:
+            try:
+                _router = TopicRouter.from_sources()
+            except Exception as e:
+                logging.warning("Topic router unavailable, searching globally: %s", e)
+                _router = TopicRouter({})
+            _router_version = version
+        return _router
+
+
+def route_filter(question: str) -> Optional[dict]:
+    """`where` filter for the question, or None to search the whole collection."""
+    # Flat TXT chunks carry no course metadata to filter on
+    if not TOPIC_ROUTING or embedding.SOURCE_FORMAT == "txt":
+        return None
+    courses = get_router().route(question)
+    if courses:
+        logging.info("Routed question to courses: %s", courses)
+    return course_filter(courses)
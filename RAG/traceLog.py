@@ -0,0 +1,91 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+# ===== CONFIG =====
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "logs/rag_trace.jsonl")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))  # share of requests traced
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "1000"))
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))  # rotate past this size
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "5"))
+# ==================
+
+_STOP = object()
+
+
+class TraceLog:
+    """
+    Background sink for per-request RAG traces.
+    log() only samples and enqueues, so it costs the request microseconds; a writer thread
+    appends the records as JSON lines to a size-rotated file. When the queue is full,
+    records are dropped (and counted) rather than blocking the request.
+    """
+
+    def __init__(self, path: str = TRACE_LOG_PATH, sample_rate: float = TRACE_SAMPLE_RATE,
+                 queue_size: int = TRACE_QUEUE_SIZE, max_bytes: int = TRACE_MAX_BYTES,
+                 backups: int = TRACE_BACKUPS):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="rag-trace-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, record: dict) -> bool:
+        """Queue a trace record; returns False if it was sampled out or dropped."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return False
+        record.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backups,
+                                      encoding="utf-8", delay=True)
+        while True:
+            record = self._queue.get()
+            if record is _STOP:
+                break
+            try:
+                line = json.dumps(record, ensure_ascii=False, default=str)
+                handler.emit(logging.makeLogRecord({"msg": line}))
+                self.written += 1
+            except Exception as e:
+                logging.error("Failed to write RAG trace: %s", e)
+        handler.close()
+
+    def close(self, timeout: float = 2.0):
+        """Write out what is queued and stop the writer thread."""
+        if self._thread.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                return
+            self._thread.join(timeout)
+
+
+class NullTraceLog:
+    def log(self, record: dict) -> bool:
+        return False
+
+    def close(self, timeout: float = 2.0):
+        pass
+
+
+trace_log = TraceLog() if TRACE_ENABLED else NullTraceLog()
+atexit.register(trace_log.close)
@@ -0,0 +1,120 @@
+# Benchmark: single-pass lxml extractor vs the old per-field PyQuery extractors
+# Run from the repo root: python -m Testing.benchExtraction [html_dir]
+# By default it reads the pages saved by the crawlers' page cache.
+
+import sys
+import time
+from pathlib import Path
+
+from pyquery import PyQuery as pq
+
+from getData.htmlExtractor import clean_word, extract_page
+
+DEFAULT_PAGES_DIR = Path("page_cache/objects")
+ROUNDS = 3
+
+
+# ---------- LEGACY EXTRACTORS (as they were in the crawlers) ----------
+def legacy_extract_code_snippets(doc: pq) -> list:
+    snippets, seen = [], set()
+    for sel in ["div.w3-example pre", "div.w3-code", "pre", "code"]:
+        for el in doc(sel).items():
+            text = el.text() or ""
+            if not text.strip():
+                continue
+            fp = (len(text), text[:80])
+            if fp in seen:
+                continue
+            seen.add(fp)
+            snippets.append(text.strip())
+    return snippets
+
+
+def legacy_extract_description(doc: pq) -> str:
+    main = doc("#main") or doc(".w3-main") or doc("body")
+    parts = []
+    for p in main("p").items():
+        t = p.text().strip()
+        if t:
+            parts.append(t)
+        if len(" ".join(parts)) > 900:
+            break
+    return " ".join(parts)[:1000]
+
+
+def legacy_extract_summary(doc: pq) -> str:
+    main = doc("#main") or doc(".w3-main") or doc("body")
+    parts = []
+    for el in main("h2, h3, p, li").items():
+        t = el.text().strip()
+        if t:
+            parts.append(t)
+    return "\n".join(parts)
+
+
+def legacy_extract_objectives(doc: pq) -> list:
+    main = doc("#main") or doc(".w3-main") or doc("body")
+    for ul in main("ul").items():
+        lis = [li.text().strip() for li in ul("li").items() if li.text().strip()]
+        if len(lis) >= 2:
+            return lis[:10]
+    return [li.text().strip() for li in main("li").items() if li.text().strip()][:5]
+
+
+def legacy_extract_glossary(doc: pq) -> list:
+    raw = set()
+    for el in doc("h1, h2, h3, strong, b, code").items():
+        w = clean_word(el.text())
+        if w:
+            raw.add(w)
+    return sorted(raw)[:400]
+
+
+def legacy_extract_page(html: str) -> dict:
+    doc = pq(html)
+    return {
+        "title": doc("h1").text().strip(),
+        "summary": legacy_extract_summary(doc),
+        "examples": legacy_extract_code_snippets(doc),
+        "description": legacy_extract_description(doc),
+        "objectives": legacy_extract_objectives(doc),
+        "glossary": legacy_extract_glossary(doc),
+    }
+
+
+def pages_per_sec(fn, pages) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for html in pages:
+            fn(html)
+        best = min(best, time.perf_counter() - start)
+    return len(pages) / best
+
+
+def main():
+    pages_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PAGES_DIR
+    pages = [p.read_text(encoding="utf-8") for p in sorted(pages_dir.rglob("*.html"))]
+    if not pages:
+        print(f"No saved pages found in {pages_dir}")
+        return
+
+    legacy = pages_per_sec(legacy_extract_page, pages)
+    single = pages_per_sec(extract_page, pages)
+    print(f"{len(pages)} pages from {pages_dir}")
+    print(f"legacy PyQuery : {legacy:8.1f} pages/sec")
+    print(f"single-pass    : {single:8.1f} pages/sec ({single / legacy:.1f}x)")
+
+    # How often both extractors agree, field by field
+    fields = ["title", "summary", "examples", "description", "objectives", "glossary"]
+    matches = dict.fromkeys(fields, 0)
+    for html in pages:
+        old, new = legacy_extract_page(html), extract_page(html)
+        for field in fields:
+            matches[field] += old[field] == new[field]
+    for field in fields:
+        print(f"  {field:<12} identical on {matches[field]}/{len(pages)} pages")
+
+
+if __name__ == "__main__":
+    main()
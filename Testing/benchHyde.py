@@ -0,0 +1,67 @@
+# Benchmark: latency HyDE adds to the query-expansion step of the fusion chain
+# Run from the repo root: python -m Testing.benchHyde          (live Groq API, needs GROQ_API_KEY)
+#                         python -m Testing.benchHyde --fake   (local fake server, measures gateway overhead only)
+# Query caching is disabled so every round pays for the LLM calls.
+
+import statistics
+import sys
+import tempfile
+import time
+
+QUESTIONS = [
+    "teach me html forms",
+    "how do python list comprehensions work",
+    "explain css flexbox with an example",
+    "what is a javascript promise",
+]
+ROUNDS = 3
+
+
+def timed(fn, question) -> float:
+    start = time.perf_counter()
+    fn(question)
+    return time.perf_counter() - start
+
+
+def main():
+    if "--fake" in sys.argv:
+        import os
+        from Testing import fakeGroqServer
+        fakeGroqServer.RATE_LIMITED = 0
+        fakeGroqServer.serve()
+        os.environ.setdefault("GROQ_API_KEY", "fake-key")
+        os.environ["GROQ_BASE_URL"] = f"http://{fakeGroqServer.HOST}:{fakeGroqServer.PORT}/openai/v1"
+
+    from RAG import ragFusion
+    from RAG.queryCache import QueryCache
+
+    ragFusion.query_cache = QueryCache(path=tempfile.mktemp(suffix=".json"), ttl=0)
+
+    def serial(question):
+        # What calling generate_hyde_document after the expansion would cost
+        ragFusion.generate_query(question)
+        ragFusion.generate_hyde_document(question)
+
+    strategies = {
+        "expansion only": lambda q: ragFusion.expand_question(q, use_hyde=False),
+        "expansion + HyDE (serial)": serial,
+        "expansion + HyDE (parallel)": lambda q: ragFusion.expand_question(q, use_hyde=True),
+    }
+
+    results = {name: [] for name in strategies}
+    for _ in range(ROUNDS):
+        for question in QUESTIONS:
+            for name, fn in strategies.items():
+                results[name].append(timed(fn, question))
+
+    baseline = statistics.median(results["expansion only"])
+    print(f"{len(QUESTIONS)} questions x {ROUNDS} rounds")
+    print(f"{'strategy':<30} {'median ms':>10} {'p90 ms':>10} {'added ms':>10}")
+    for name, samples in results.items():
+        median = statistics.median(samples)
+        p90 = statistics.quantiles(samples, n=10)[-1]
+        print(f"{name:<30} {median * 1000:>10.0f} {p90 * 1000:>10.0f} {(median - baseline) * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
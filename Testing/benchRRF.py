@@ -0,0 +1,67 @@
+# Micro-benchmark: id-keyed RRF vs the old dumps/loads RRF
+# Run from the repo root: python -m Testing.benchRRF
+
+import random
+import timeit
+
+from langchain.docstore.document import Document
+from langchain.load import dumps, loads
+
+from RAG.ragFusion import reciprocal_rank_fusion
+
+LIST_COUNTS = [4, 10, 50]
+DOCS_PER_LIST = [5, 20, 100]
+REPEAT = 5
+
+
+def legacy_reciprocal_rank_fusion(ranked_lists, k=5):
+    """The previous implementation, keyed on the JSON-serialized document."""
+    scores = {}
+    for results in ranked_lists:
+        for rank, doc in enumerate(results):
+            key = dumps(doc)
+            scores.setdefault(key, 0.0)
+            scores[key] += 1.0 / (rank + k)
+
+    fused = [(loads(key), score) for key, score in scores.items()]
+    fused.sort(key=lambda x: x[1], reverse=True)
+    return fused
+
+
+def make_ranked_lists(num_lists, docs_per_list, seed=0):
+    """Draw overlapping ranked lists from a shared pool, like fusion queries hitting the same chunks."""
+    rng = random.Random(seed)
+    pool = [
+        Document(
+            page_content=f"title: Section {i}\nsummary: " + "lorem ipsum dolor sit amet " * 60,
+            metadata={"source_file": f"course_{i % 7}.txt"},
+            id=f"chunk-{i}",
+        )
+        for i in range(docs_per_list * 3)
+    ]
+    return [rng.sample(pool, docs_per_list) for _ in range(num_lists)]
+
+
+def bench(fn, ranked_lists):
+    number = 3
+    best = min(timeit.repeat(lambda: fn(ranked_lists), number=number, repeat=REPEAT))
+    return best / number * 1000
+
+
+def main():
+    print(f"{'lists':>5} {'docs':>5} {'legacy ms':>10} {'id-keyed ms':>12} {'speedup':>8}")
+    for num_lists in LIST_COUNTS:
+        for docs_per_list in DOCS_PER_LIST:
+            ranked_lists = make_ranked_lists(num_lists, docs_per_list)
+
+            legacy_ids = [doc.id for doc, _ in legacy_reciprocal_rank_fusion(ranked_lists)]
+            fused_ids = [doc.id for doc, _ in reciprocal_rank_fusion(ranked_lists)]
+            assert legacy_ids == fused_ids, "fusion order differs from the legacy implementation"
+
+            legacy_ms = bench(legacy_reciprocal_rank_fusion, ranked_lists)
+            fused_ms = bench(reciprocal_rank_fusion, ranked_lists)
+            print(f"{num_lists:>5} {docs_per_list:>5} {legacy_ms:>10.3f} {fused_ms:>12.3f} {legacy_ms / fused_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
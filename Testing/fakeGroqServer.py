@@ -0,0 +1,126 @@
+# Local stand-in for the Groq chat completions API, for exercising LLM.py without a key or network.
+# Serve:  python -m Testing.fakeGroqServer
+# Check:  python -m Testing.fakeGroqServer --check
+#         (starts the server, points LLM.py at it and runs concurrent streaming calls,
+#          with the first requests rate limited to exercise retries)
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HOST, PORT = "127.0.0.1", 8765
+REPLY = "Hello from the fake Groq server. HTML stands for HyperText Markup Language."
+CHUNK_DELAY = 0.01   # seconds between streamed chunks
+RATE_LIMITED = 3     # first N requests get a 429 with Retry-After
+CHECK_CALLS = 12
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is visible
+    lock = threading.Lock()
+    requests = 0
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            FakeGroqHandler.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with self.lock:
+            FakeGroqHandler.requests += 1
+            rate_limited = FakeGroqHandler.requests <= RATE_LIMITED
+
+        if self.path.rstrip("/") != "/openai/v1/chat/completions":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if rate_limited:
+            message = b'{"error": {"message": "Rate limit reached"}}'
+            self.send_response(429)
+            self.send_header("Retry-After", "0.2")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(message)))
+            self.end_headers()
+            self.wfile.write(message)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        words = REPLY.split(" ")[: max(1, body.get("max_completion_tokens", 1024))]
+        try:
+            for n, word in enumerate(words):
+                chunk = {
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {"content": word if n == 0 else " " + word}}],
+                }
+                self.send_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                time.sleep(CHUNK_DELAY)
+            self.send_chunk(b"data: [DONE]\n\n")
+            self.send_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client cancelled the stream
+
+
+def serve(port: int = PORT) -> ThreadingHTTPServer:
+    """Start the server on a background thread."""
+    server = ThreadingHTTPServer((HOST, port), FakeGroqHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def check():
+    server = serve()
+    os.environ.setdefault("GROQ_API_KEY", "fake-key")
+    os.environ["GROQ_BASE_URL"] = f"http://{HOST}:{PORT}/openai/v1"
+    import LLM
+
+    results, ttft = [None] * CHECK_CALLS, [None] * CHECK_CALLS
+
+    def call(n):
+        start = time.perf_counter()
+        parts = []
+        for chunk in LLM.run_llm("system", f"question {n}"):
+            if not parts:
+                ttft[n] = time.perf_counter() - start
+            parts.append(chunk)
+        results[n] = "".join(parts)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=call, args=(n,)) for n in range(CHECK_CALLS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ok = sum(r == REPLY for r in results)
+    print(f"{ok}/{CHECK_CALLS} calls streamed the full reply in {elapsed:.2f}s")
+    print(f"time to first token: min {min(ttft):.3f}s, max {max(ttft):.3f}s")
+    print(f"{FakeGroqHandler.requests} HTTP requests ({RATE_LIMITED} rate limited) "
+          f"over {FakeGroqHandler.connections} connections")
+    server.shutdown()
+    return ok == CHECK_CALLS
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv:
+        sys.exit(0 if check() else 1)
+    print(f"Fake Groq API on http://{HOST}:{PORT}/openai/v1 (set GROQ_BASE_URL to use it)")
+    ThreadingHTTPServer((HOST, PORT), FakeGroqHandler).serve_forever()
@@ -1,23 +1,35 @@
+import logging
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 from langchain.prompts import ChatPromptTemplate
 import os
 
 import RAG
 import LLM
+from chatHistory import HistoryManager
 from RAG import embedding, RAG
+from RAG.answerCache import SemanticAnswerCache, replay, ANSWER_CACHE_ENABLED
+from RAG.topicGuard import TopicGuard, UNSUPPORTED_FILE, UNSUPPORTED_MESSAGE
 
 # Temporary torch workaround (fixes some HF models on Streamlit Cloud)
 sys.modules.setdefault('torch.classes', type('FakeModule', (), {'__path__': []})())
 
-# File paths
-UNSUPPORTED_FILE = os.path.join("topics", "unsupported_topics.txt")
+# Speculative answers: start streaming from a single lookup on the raw question while the
+# full fusion chain runs; append a refinement if fusion picks substantially different chunks
+SPECULATIVE_ANSWER = os.getenv("SPECULATIVE_ANSWER", "true").lower() == "true"
+SPECULATIVE_MIN_OVERLAP = float(os.getenv("SPECULATIVE_MIN_OVERLAP", "0.5"))  # share of fusion chunks already used
+FUSION_WAIT_TIMEOUT = 60  # seconds
+REFINEMENT_HEADER = "\n\n---\n**📚 More from the tutorials:**\n\n"
 
 # Initialize session state
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
+if "history" not in st.session_state:
+    st.session_state.history = HistoryManager()
+
 if "user_input" not in st.session_state:
     st.session_state.user_input = ""
 
@@ -32,6 +44,32 @@ def load_vectorstore():
 
 vectorstore = load_vectorstore()
 
+
+@st.cache_resource
+def load_answer_cache():
+    # Shared across sessions; reuses the vectorstore's EMBED_MODEL for question embeddings
+    return SemanticAnswerCache(vectorstore.embeddings, embedding.get_index_version)
+
+
+answer_cache = load_answer_cache()
+
+
+@st.cache_resource
+def load_fusion_pool():
+    # Runs the fusion chain in the background while the speculative answer streams
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-fusion")
+
+
+fusion_pool = load_fusion_pool()
+
+
+@st.cache_resource
+def load_topic_guard():
+    return TopicGuard()
+
+
+topic_guard = load_topic_guard()
+
 # --- Default fallbacks ---
 def default_content():
     return 'This is a default content. If you see this, respond: "There is no content here".'
@@ -72,6 +110,32 @@ Task: {question}
     )
 
 
+def generate_refinement_prompt(content, context, question, answer):
+    template = """{content}
+
+Context:
+{context}
+
+Task: {question}
+
+Answer already given to the learner:
+{answer}
+
+The context above was retrieved more thoroughly than the one that answer was based on.
+Reply only with a short addition covering what the answer misses or gets wrong according to this context.
+If nothing important is missing, reply with nothing.
+"""
+    prompt = ChatPromptTemplate.from_template(template)
+    return prompt.format(content=content, context=context, question=question, answer=answer)
+
+
+def chunk_overlap(fast_ids, fusion_ids):
+    """Share of the fusion chunks that the speculative answer already had."""
+    if not fusion_ids:
+        return 1.0
+    return len(set(fast_ids) & set(fusion_ids)) / len(set(fusion_ids))
+
+
 # --- Log unsupported queries ---
 def log_unsupported(query: str):
     normalized = query.lower().strip()
@@ -81,11 +145,7 @@ def log_unsupported(query: str):
 
 # --- Generate context and prompt for a query ---
 def prepare_prompt(query):
-    history = "\n".join(
-        f"{msg['speaker']}: {msg['message']}"
-        for msg in st.session_state.chat_history
-        if msg["speaker"] in ("User", "Tutor")
-    )
+    history = st.session_state.history.render()
     context, content = RAG.get_context(query, vectorstore)
     final_prompt = generate_prompt(content, context, query, history)
     return final_prompt
@@ -105,6 +165,7 @@ def handle_chat():
             "time": None,
         }
     )
+    st.session_state.history.add("User", query)
 
     # mark for streaming in the main loop
     st.session_state.pending_query = query
@@ -144,19 +205,72 @@ if st.session_state.get("pending_query"):
     query = st.session_state.pending_query
     st.session_state.pending_query = None
 
-    final_prompt = prepare_prompt(query)
     placeholder = chat_container.empty()
 
     response_text = ""
     start_time = time.time()
     error_msg = None
 
+    # Known unsupported topics are refused before any LLM or vectorstore call
+    rejected_early = topic_guard.is_unsupported(query)
+    # Answers depend on the chat history, so only a session's opening question
+    # (no earlier turns besides this one) is looked up in or stored to the shared cache
+    cacheable = ANSWER_CACHE_ENABLED and len(st.session_state.chat_history) <= 1
+    cached_answer = None
+    if not rejected_early and cacheable:
+        cached_answer = answer_cache.lookup(query)
+
+    fusion_future = None
     try:
-        # Stream response chunks from LLM
-        for chunk in LLM.run_llm(final_prompt, query):
+        if rejected_early:
+            stream = iter([UNSUPPORTED_MESSAGE])
+        elif cached_answer is not None:
+            stream = replay(cached_answer)
+        elif SPECULATIVE_ANSWER:
+            history = st.session_state.history.render()
+            fast_trace, fusion_trace = {}, {}
+            fusion_future = fusion_pool.submit(RAG.get_context, query, vectorstore, fusion_trace)
+            context, content = RAG.get_fast_context(query, vectorstore, fast_trace)
+            if not context.strip():
+                # Nothing to speculate from: answer from the fusion context as usual
+                context, content = fusion_future.result(timeout=FUSION_WAIT_TIMEOUT)
+                fusion_future = None
+            stream = LLM.run_llm(generate_prompt(content, context, query, history), query)
+        else:
+            final_prompt = prepare_prompt(query)
+            stream = LLM.run_llm(final_prompt, query)
+
+        # Stream response chunks from LLM (or the answer cache)
+        for chunk in stream:
             response_text += chunk
             placeholder.markdown(f"**🤖 Tutor:** {response_text}")
 
+        # Fusion finished in the background; refine if it found substantially different chunks
+        answered = response_text.strip() and not response_text.startswith("⚠️") \
+            and response_text.strip() != UNSUPPORTED_MESSAGE
+        if fusion_future is not None and answered:
+            try:
+                fusion_context, content = fusion_future.result(timeout=FUSION_WAIT_TIMEOUT)
+                overlap = chunk_overlap(fast_trace.get("chunk_ids", []), fusion_trace.get("chunk_ids", []))
+                if fusion_context.strip() and overlap < SPECULATIVE_MIN_OVERLAP:
+                    refinement = LLM.run_llm(
+                        generate_refinement_prompt(content, fusion_context, query, response_text), query
+                    )
+                    added = ""
+                    for chunk in refinement:
+                        if not added and chunk.startswith("⚠️"):
+                            break
+                        if not added and not chunk.strip():
+                            continue
+                        if not added:
+                            response_text += REFINEMENT_HEADER
+                        added += chunk
+                        response_text += chunk
+                        placeholder.markdown(f"**🤖 Tutor:** {response_text}")
+            except Exception as e:
+                # The speculative answer stands on its own
+                logging.warning(f"Refinement skipped: {e}")
+
     except Exception as e:
         error_msg = f"⚠️ Error generating response: {e}"
 
@@ -172,6 +286,7 @@ if st.session_state.get("pending_query"):
                 "time": response_time,
             }
         )
+        st.session_state.history.add("Tutor", final_message)
 
         # Render final version (don’t empty the placeholder)
         if error_msg:
@@ -181,7 +296,15 @@ if st.session_state.get("pending_query"):
                 f"**🤖 Tutor:** {final_message}\n\n_⏱️ Response Time: {response_time:.2f} seconds_"
             )
 
-        # If unsupported message, log it
-        unsupported_message = "❌ Sorry, this topic is not supported yet. Please wait for an update."
-        if final_message.strip() == unsupported_message:
-            log_unsupported(query)
+        # If the model refused the topic, log it so the guard refuses it up front next time
+        if final_message.strip() == UNSUPPORTED_MESSAGE:
+            if not rejected_early:
+                log_unsupported(query)
+        elif (
+            cacheable
+            and cached_answer is None
+            and not error_msg
+            and final_message.strip()
+            and not final_message.startswith("⚠️")
+        ):
+            answer_cache.store(query, final_message)
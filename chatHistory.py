@@ -0,0 +1,152 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from RAG.contextAssembler import count_tokens
+
+# ===== CONFIG =====
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "6"))  # messages kept verbatim
+HISTORY_TOKEN_CAP = int(os.getenv("HISTORY_TOKEN_CAP", "1500"))
+SUMMARY_TOKEN_CAP = int(os.getenv("SUMMARY_TOKEN_CAP", "400"))
+# ==================
+
+# Summaries are folded in the background, after the answer has been streamed
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+
+Turn = Tuple[str, str]
+TRUNCATION_MARKER = " …"
+
+
+def format_turns(turns: List[Turn]) -> str:
+    return "\n".join(f"{speaker}: {message}" for speaker, message in turns)
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most `max_tokens` (marker included), keeping whole words."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    words = text.split()
+    while words:
+        words = words[: int(len(words) * 0.9)]
+        cut = " ".join(words) + TRUNCATION_MARKER
+        if count_tokens(cut) <= max_tokens:
+            return cut
+    return ""
+
+
+def extractive_summary(summary: str, turns: List[Turn]) -> str:
+    """Cheap fallback: keep the first sentence of every folded turn."""
+    lines = [summary] if summary else []
+    for speaker, message in turns:
+        first = message.strip().split("\n")[0].split(". ")[0]
+        lines.append(f"{speaker}: {first[:200]}")
+    return "\n".join(lines)
+
+
+def llm_summary(summary: str, turns: List[Turn]) -> str:
+    """Update the running summary with the turns that just left the verbatim window."""
+    import LLM
+
+    system_prompt = (
+        "You maintain a running summary of a tutoring chat between a learner and a coding tutor.\n"
+        "Update the summary with the new messages. Keep topics, languages, exercises given and the "
+        "learner's level or preferences. Drop code and formatting. Reply with the summary only, "
+        f"at most {SUMMARY_TOKEN_CAP // 2} words."
+    )
+    user_query = f"Current summary:\n{summary or '(empty)'}\n\nNew messages:\n{format_turns(turns)}"
+    output = "".join(LLM.run_llm(system_prompt, user_query, profile="summary")).strip()
+    if not output or output.startswith("⚠️"):
+        raise RuntimeError(output or "empty summary")
+    return output
+
+
+class HistoryManager:
+    """
+    Token-bounded chat history for prompt assembly.
+    The last `max_turns` messages are kept verbatim; older ones are folded into a
+    running summary once, as they leave the window, instead of being re-rendered
+    every turn. The rendered history never exceeds `token_cap` tokens.
+    """
+
+    def __init__(self, max_turns: int = HISTORY_MAX_TURNS, token_cap: int = HISTORY_TOKEN_CAP,
+                 summarizer: Callable[[str, List[Turn]], str] = llm_summary):
+        self.max_turns = max_turns
+        self.token_cap = token_cap
+        self.summarizer = summarizer
+        self.recent = deque()
+        self.summary = ""
+        self._future = None
+        self._pending_turns = []
+        self._rendered: Optional[str] = None
+
+    def add(self, speaker: str, message: str):
+        self.recent.append((speaker, message))
+        self._rendered = None
+
+        evicted = []
+        while len(self.recent) > self.max_turns:
+            evicted.append(self.recent.popleft())
+        if evicted:
+            self._fold(evicted)
+
+    def _fold(self, turns: List[Turn]):
+        previous = self._future
+        self._pending_turns.extend(turns)
+
+        def run():
+            summary = previous.result() if previous is not None else self.summary
+            try:
+                new_summary = self.summarizer(summary, turns)
+            except Exception as e:
+                logging.warning("History summarization failed, using extractive summary: %s", e)
+                new_summary = extractive_summary(summary, turns)
+            return truncate_tokens(new_summary, SUMMARY_TOKEN_CAP)
+
+        self._future = _summary_pool.submit(run)
+
+    def _current_summary(self) -> str:
+        """The folded summary if it is ready; never waits for it, so it stays off the answer's path."""
+        if self._future is None:
+            return self.summary
+        if not self._future.done():
+            logging.info("History summary still running, using extractive summary for this turn")
+            return truncate_tokens(extractive_summary(self.summary, self._pending_turns), SUMMARY_TOKEN_CAP)
+        self.summary = self._future.result()  # run() never raises: it falls back to an extractive summary
+        self._future = None
+        self._pending_turns = []
+        self._rendered = None
+        return self.summary
+
+    def render(self) -> str:
+        """Return the history block for the prompt, within the token cap."""
+        summary = self._current_summary()
+        if self._rendered is not None and self._future is None:
+            return self._rendered
+
+        # Recent turns take priority; the summary gets whatever budget is left
+        turns = list(self.recent)
+        turns_text = format_turns(turns)
+        while len(turns) > 1 and count_tokens(turns_text) > self.token_cap:
+            turns.pop(0)
+            turns_text = format_turns(turns)
+        turns_text = truncate_tokens(turns_text, self.token_cap)
+
+        header = "Summary of earlier conversation:"
+        rendered = turns_text
+        remaining = self.token_cap - count_tokens(f"{header}\n\n\n{turns_text}")
+        while summary and remaining > 0:
+            kept = truncate_tokens(summary, remaining)
+            if not kept:
+                break
+            candidate = f"{header}\n{kept}\n\n{turns_text}"
+            overshoot = count_tokens(candidate) - self.token_cap
+            if overshoot <= 0:
+                rendered = candidate
+                break
+            remaining -= overshoot  # token counts aren't exactly additive across the joins
+
+        if self._future is None:
+            self._rendered = rendered
+        return rendered
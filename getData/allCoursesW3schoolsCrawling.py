@@ -2,20 +2,32 @@
 import asyncio
 import json
 import logging
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 from typing import Optional
 
 from crawl4ai import AsyncWebCrawler, CrawlerRunConfig
 from crawl4ai.content_scraping_strategy import LXMLWebScrapingStrategy
 from pyquery import PyQuery as pq
 
+from crawlFrontier import CrawlFrontier
+from htmlExtractor import extract_page
+from pageCache import PageCache
+from sectionStream import SectionStream, course_record, section_record
+
 # ---------- CONFIG ----------
 INDEX_URL = "https://www.w3schools.com/bootstrap5/index.php"
 OUTPUT_DIR = Path("W3_Tutorials_ALL")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# "jsonl" = append-only stream with one record per section (consumed directly by the embedding step)
+# "json"  = one JSON file per course, written when the course is finished
+OUTPUT_FORMAT = "jsonl"
+SECTIONS_JSONL = Path("data/W3_Tutorials_All/sections.jsonl")  # read from here by RAG/embedding.py
+
 # How many courses to discover from the tutorials index (set to None for no limit)
 COURSE_LIMIT = 20
 
@@ -23,7 +35,21 @@ COURSE_LIMIT = 20
 SECTIONS_LIMIT = 3
 
 # Crawler settings (throttle)
-DELAY_BETWEEN_COURSES = 1.0  # seconds
+MAX_CONCURRENT_PAGES = 4       # pages fetched at the same time, across all courses
+MAX_CONCURRENT_COURSES = 2     # courses crawled at the same time
+REQUESTS_PER_SECOND = 2.0      # per host, replaces a fixed delay between courses
+
+# Extraction settings (CPU-bound parsing runs in worker processes, off the event loop)
+EXTRACT_WORKERS = os.cpu_count() or 2
+PARSE_QUEUE_SIZE = 16          # fetched pages waiting to be parsed before fetchers back off
+
+# Page cache: re-crawls revalidate cached pages instead of re-rendering them
+PAGE_CACHE_DIR = Path("page_cache")
+REPLAY_FROM_CACHE = False  # True = extract from cached pages only, no network
+
+# Crawl frontier: per-section checkpoints so a restarted crawl resumes where it stopped
+# (delete the file to force a full re-crawl)
+FRONTIER_DB = Path("crawl_frontier.sqlite")
 
 logging.basicConfig(
     filename="crawl_log.txt",
@@ -32,20 +58,7 @@ logging.basicConfig(
 )
 
 
-# ---------- FILTERS / CLEANUP ----------
-STOPWORDS = {
-    "the", "and", "for", "with", "from", "this", "that", "these", "those",
-    "click", "here", "your", "about", "into", "over", "under", "while",
-    "example", "examples", "tutorial", "introduction", "learn", "default"
-}
-JUNKWORDS = {"sales", "services", "contact", "analytics", "certificate", "certificates", "subscribe"}
-BAD_TERMS = {
-    "tutorial", "tutorials", "tip", "tips", "spaces", "w3", "w3css", "w3 css",
-    "w3schools", "navbar", "vertical", "building", "web building",
-    "default", "introduction", "learn", "overview", "home", "reference", "references"
-}
-
-
+# ---------- HELPERS ----------
 def sanitize_filename(name: str) -> str:
     """Make a filesystem-safe lower_snake filename for the course."""
     n = name.strip().lower()
@@ -57,157 +70,13 @@ def sanitize_filename(name: str) -> str:
     return n
 
 
-def clean_word(text: str) -> Optional[str]:
-    """
-    Clean and filter a candidate glossary word/phrase.
-    Returns a normalized word (lowercase) or None if rejected.
-    """
-    if not text:
-        return None
-    w = text.strip().lower()
-    # replace other chars with space, allow a-z0-9 + # - .
-    w = re.sub(r"[^a-z0-9+#\-\.\s]", " ", w)
-    w = re.sub(r"\s+", " ", w).strip()
-
-    if len(w) < 2 or len(w) > 50:
-        return None
-
-    tokens = w.split()
-    if len(tokens) > 2:
-        return None
-
-    if w in BAD_TERMS:
-        return None
-    if any(tok in STOPWORDS for tok in tokens):
-        return None
-    if any(tok in JUNKWORDS for tok in tokens):
-        return None
-
-    if not re.search(r"[a-z]", w):
-        return None
-
-    return w
-
-
-# ---------- EXTRACTORS ----------
-def extract_menu_links(doc: pq, base_url: str) -> list:
-    """Return list of {title, url} for section links in the left menu of a course page."""
-    links, seen = [], set()
-    for a in doc("#leftmenuinner a").items():
-        href = a.attr("href")
-        text = a.text().strip()
-        if not href or not text:
-            continue
-        if href.startswith("#") or href.lower().startswith("javascript:"):
-            continue
-        full = urljoin(base_url, href)
-        if full in seen:
-            continue
-        seen.add(full)
-        links.append({"title": text, "url": full})
-    return links
-
-
-def extract_code_snippets(doc: pq) -> list:
-    snippets, seen = [], set()
-    for sel in ["div.w3-example pre", "div.w3-code", "pre", "code"]:
-        for el in doc(sel).items():
-            text = el.text() or ""
-            if not text.strip():
-                continue
-            fp = (len(text), text[:80])
-            if fp in seen:
-                continue
-            seen.add(fp)
-            snippets.append(text.strip())
-    return snippets
-
-
-def extract_description(doc: pq) -> str:
-    """Take the first meaningful paragraphs from the main content as description."""
-    main = doc("#main") or doc(".w3-main") or doc("body")
-    parts = []
-    for p in main("p").items():
-        t = p.text().strip()
-        if t:
-            parts.append(t)
-        if len(" ".join(parts)) > 900:
-            break
-    return " ".join(parts)[:1000]
-
-
-def extract_summary(doc: pq) -> str:
-    """Extract h2/h3/p/li text inside the article/main area for the page summary."""
-    main = doc("#main") or doc(".w3-main") or doc("body")
-    parts = []
-    for el in main("h2, h3, p, li").items():
-        t = el.text().strip()
-        if t:
-            parts.append(t)
-    return "\n".join(parts)
-
-
-def extract_glossary(doc: pq, menu_links: list) -> list:
-    """Collect candidate glossary words from headings + menu + code + strong, then clean and limit."""
-    raw = set()
-
-    for el in doc("h1, h2, h3, strong, b, code").items():
-        w = clean_word(el.text())
-        if w:
-            raw.add(w)
-
-    for link in menu_links:
-        w = clean_word(link["title"])
-        if w:
-            raw.add(w)
-
-    glossary = sorted(raw)
-    return glossary[:400]
-
-
-def extract_objectives(doc: pq) -> list:
-    """Extracts learning objectives (e.g., first bullet list after h1)."""
-    main = doc("#main") or doc(".w3-main") or doc("body")
-    objectives = []
-    ul = main("h1").next_all("ul").eq(0)
-    for li in ul("li").items():
-        txt = li.text().strip()
-        if txt:
-            objectives.append(txt)
-    return objectives[:10]
-
-
 # ---------- OBJECTIVE EXTRACTION HANDLER ----------
-def extract_objectives(doc: pq) -> list:
-    """
-    Extract learning objectives:
-    - Look for the first bullet list (<ul>) in #main that has at least 2 items
-    - Fall back to the first few <li> in #main
-    """
-    main = doc("#main") or doc(".w3-main") or doc("body")
-    objectives = []
-
-    # try first non-trivial <ul> in main
-    for ul in main("ul").items():
-        lis = [li.text().strip() for li in ul("li").items() if li.text().strip()]
-        if len(lis) >= 2:  # consider it objectives only if >1 items
-            objectives = lis
-            break
-
-    # fallback: grab first 5 <li> in main
-    if not objectives:
-        objectives = [li.text().strip() for li in main("li").items() if li.text().strip()][:5]
-
-    return objectives[:10]
-
-
-
-def get_course_objectives(tut_doc: pq) -> list:
+def get_course_objectives(tut_html: str) -> list:
     """
-    Wrapper around extract_objectives.
-    Provides a single place to modify or extend objective logic later.
+    Extract learning objectives (first <ul> in the main area with at least 2 items,
+    else the first few <li>). Provides a single place to modify objective logic later.
     """
-    return extract_objectives(tut_doc)
+    return extract_page(tut_html)["objectives"]
 
 
 async def process_objectives_for_file(filepath: Path, crawler: AsyncWebCrawler, run_config: CrawlerRunConfig):
@@ -234,8 +103,7 @@ async def process_objectives_for_file(filepath: Path, crawler: AsyncWebCrawler,
         print(f"❌ No HTML for {url}")
         return
 
-    tut_doc = pq(tut_html)
-    data["objectives"] = get_course_objectives(tut_doc)
+    data["objectives"] = get_course_objectives(tut_html)
 
     with filepath.open("w", encoding="utf-8") as outfile:
         json.dump(data, outfile, indent=2, ensure_ascii=False)
@@ -253,83 +121,184 @@ async def add_objectives():
             await process_objectives_for_file(f, crawler, run_config)
 
 
+# ---------- THROTTLING ----------
+class HostRateLimiter:
+    """Spaces out requests to the same host to at most `rate` per second."""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND):
+        self.interval = 1.0 / rate
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        host = urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+page_cache = PageCache(PAGE_CACHE_DIR, replay=REPLAY_FROM_CACHE)
+
+
+async def fetch_html(crawler: AsyncWebCrawler, run_config: CrawlerRunConfig, url: str,
+                     semaphore: asyncio.Semaphore, limiter: HostRateLimiter) -> Optional[str]:
+    """
+    Fetch one page through the shared concurrency pool and per-host rate limiter.
+    Cached pages are revalidated and only re-rendered in the browser when they changed.
+    """
+    async def render():
+        await limiter.wait(url)
+        results = await crawler.arun(url=url, config=run_config)
+        result = next((r for r in results if getattr(r, "html", None)), None)
+        if result is None:
+            return None, {}
+        return result.html, getattr(result, "response_headers", None) or {}
+
+    async with semaphore:
+        return await page_cache.fetch(url, render, throttle=limiter.wait)
+
+
 # ---------- CRAWLING LOGIC ----------
-async def crawl_course(crawler: AsyncWebCrawler, run_config: CrawlerRunConfig, course_name: str, tut_url: str):
+async def crawl_course(crawler: AsyncWebCrawler, run_config: CrawlerRunConfig, course_name: str, tut_url: str,
+                       semaphore: asyncio.Semaphore, limiter: HostRateLimiter, pool: ProcessPoolExecutor,
+                       frontier: CrawlFrontier, stream: Optional[SectionStream] = None):
     filename = sanitize_filename(course_name) + ".json"
     out_file = OUTPUT_DIR / filename
 
     logging.info(f"➡️  Crawling course: {course_name} -> {tut_url}")
 
     try:
-        results = await crawler.arun(url=tut_url, config=run_config)
+        tut_html = await fetch_html(crawler, run_config, tut_url, semaphore, limiter)
     except Exception as e:
         logging.error(f"❌ Failed to fetch course root {tut_url}: {e}")
         return
 
-    tut_html = next((r.html for r in results if getattr(r, "html", None)), None)
     if not tut_html:
         logging.warning(f"❌ No HTML for {tut_url}")
         return
 
-    tut_doc = pq(tut_html)
+    loop = asyncio.get_running_loop()
 
-    menu_links = extract_menu_links(tut_doc, tut_url)
-    glossary = extract_glossary(tut_doc, menu_links)
+    # One pass over the course root gives the section menu and glossary
+    tut_page = await loop.run_in_executor(pool, extract_page, tut_html, tut_url)
+    menu_links = tut_page["menu_links"]
+    glossary = tut_page["glossary"]
+
+    # Sections checkpointed by an earlier, interrupted run are not fetched again
+    frontier.start_course(course_name, tut_url, menu_links)
+    pages = [None] * len(menu_links)
+    for idx, page in frontier.done_pages(course_name).items():
+        if idx < len(pages):
+            pages[idx] = page
+    if any(pages):
+        logging.info(f"   • Resuming {course_name}: {sum(p is not None for p in pages)}/{len(pages)} sections checkpointed")
 
     description = ""
     objectives = []
     course_summary = []
 
-    for idx, link in enumerate(menu_links):
-        section_url = link["url"]
+    # Fetchers push raw HTML onto a bounded queue; extractor workers parse it
+    # in the process pool, so network and CPU overlap
+    queue = asyncio.Queue(maxsize=PARSE_QUEUE_SIZE)
 
+    async def fetch_section(idx: int, section_url: str):
         try:
-            sec_results = await crawler.arun(url=section_url, config=run_config)
+            sec_html = await fetch_html(crawler, run_config, section_url, semaphore, limiter)
         except Exception as e:
             logging.warning(f"Failed to fetch section {section_url}: {e}")
+            frontier.mark_failed(course_name, idx, str(e))
+            sec_html = None
+        await queue.put((idx, sec_html))
+
+    async def extract_worker():
+        while True:
+            idx, sec_html = await queue.get()
+            section_url = menu_links[idx]["url"]
+            try:
+                if not sec_html:
+                    logging.warning(f"No HTML for section {section_url}")
+                    continue
+                # One pass over the section page gives every field at once
+                pages[idx] = await loop.run_in_executor(pool, extract_page, sec_html)
+                # Stream first: a resumed course restores checkpointed pages without re-streaming them,
+                # while a section streamed twice is harmless (readers keep the last record)
+                if stream:
+                    stream.write(section_record(course_name, idx, menu_links[idx], pages[idx]))
+                frontier.checkpoint_section(course_name, idx, pages[idx])
+            except Exception as e:
+                logging.warning(f"Failed to extract section {section_url}: {e}")
+                frontier.mark_failed(course_name, idx, str(e))
+            finally:
+                queue.task_done()
+
+    workers = [asyncio.create_task(extract_worker()) for _ in range(EXTRACT_WORKERS)]
+    try:
+        await asyncio.gather(*(
+            fetch_section(idx, link["url"]) for idx, link in enumerate(menu_links) if pages[idx] is None
+        ))
+        await queue.join()
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+    # Reassemble sections in menu order
+    for idx, (link, page) in enumerate(zip(menu_links, pages)):
+        if page is None:
             continue
 
-        sec_html = next((sr.html for sr in sec_results if getattr(sr, "html", None)), None)
-        if not sec_html:
-            logging.warning(f"No HTML for section {section_url}")
-            continue
-
-        sec_doc = pq(sec_html)
-
         if idx == 0:
             # ✅ Only extract description + objectives from FIRST section
-            description = extract_description(sec_doc)
-            objectives = get_course_objectives(sec_doc)
+            description = page["description"]
+            objectives = page["objectives"]
             logging.info(f"   • Description extracted ({len(description)} chars)")
             logging.info(f"   • Objectives extracted ({len(objectives)} items)")
-            break   # ⛔ stop after first section
 
+        title = page["title"] or link.get("title", "")
+        summary = page["summary"]
+        examples = page["examples"]
+
+        if not stream:
+            course_summary.append({
+                "title": title or link.get("title", ""),
+                "url": link["url"],
+                "summary": summary,
+                "examples": examples
+            })
+        logging.info(f"   • Section: {title} ({len(examples)} examples)")
 
-        title = sec_doc("h1").text().strip() or link.get("title", "")
-        summary = extract_summary(sec_doc)
-        examples = extract_code_snippets(sec_doc)
+    if stream:
+        stream.write(course_record(course_name, tut_url, description, objectives, glossary))
+        logging.info(f"✅ Streamed {course_name} -> {SECTIONS_JSONL.name}")
+    else:
+        try:
+            write_course_json(out_file, course_name, tut_url, description, course_summary, glossary, objectives)
+        except Exception as e:
+            logging.error(f"❌ Failed to write file {out_file}: {e}")
+            return
 
-        course_summary.append({
-            "title": title or link.get("title", ""),
-            "summary": summary,
-            "examples": examples
-        })
-        logging.info(f"   • Section: {title} ({len(examples)} examples)")
+    # Only a course with every section extracted counts as finished
+    if all(page is not None for page in pages):
+        frontier.finish_course(course_name)
 
+
+def write_course_json(out_file: Path, course_name: str, course_url: str, description: str, course_summary: list,
+                      glossary: list, objectives: list):
     out = {
         "course_name": course_name,
+        "course_url": course_url,
         "description": description,
         "course_summary": course_summary,
         "glossary": glossary,
         "objectives": objectives,   # ✅ now pulled from first section only
     }
 
-    try:
-        with out_file.open("w", encoding="utf-8") as f:
-            json.dump(out, f, indent=2, ensure_ascii=False)
-        logging.info(f"✅ Saved {course_name} -> {out_file.name}")
-    except Exception as e:
-        logging.error(f"❌ Failed to write file {out_file}: {e}")
+    with out_file.open("w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2, ensure_ascii=False)
+    logging.info(f"✅ Saved {course_name} -> {out_file.name}")
 
 
 
@@ -345,17 +314,16 @@ async def main():
         wait_for="document.querySelector('h1') || document.querySelector('.w3-example')",
     ) as crawler:
 
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_PAGES)
+        course_semaphore = asyncio.Semaphore(MAX_CONCURRENT_COURSES)
+        limiter = HostRateLimiter(REQUESTS_PER_SECOND)
+
         try:
-            idx_results = await crawler.arun(url=INDEX_URL, config=run_config)
+            index_html = await fetch_html(crawler, run_config, INDEX_URL, semaphore, limiter)
         except Exception as e:
             logging.error(f"Failed to fetch index {INDEX_URL}: {e}")
             return
 
-        index_html = None
-        for r in idx_results:
-            if getattr(r, "html", None):
-                index_html = r.html
-                break
         if not index_html:
             logging.error("No HTML for tutorials index page")
             return
@@ -376,15 +344,33 @@ async def main():
         logging.info(f"Discovered {len(courses)} courses")
         print(f"Discovered {len(courses)} courses")
 
-        for name, url in courses.items():
-            fname = sanitize_filename(name) + ".json"
-            # if (OUTPUT_DIR / fname).exists():
-            #     logging.info(f"⏭️ Skipping {name} (file exists: {fname})")
-            #     print(f"⏭️ Skipping {name} (file exists: {fname})")
-            #     continue
+        pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        frontier = CrawlFrontier(FRONTIER_DB)
+        stream = SectionStream(SECTIONS_JSONL) if OUTPUT_FORMAT == "jsonl" else None
 
-            await crawl_course(crawler, run_config, name, url)
-            await asyncio.sleep(DELAY_BETWEEN_COURSES)
+        async def bounded_crawl(name: str, url: str):
+            output = SECTIONS_JSONL if stream else OUTPUT_DIR / (sanitize_filename(name) + ".json")
+            fname = output.name
+            if frontier.course_done(name) and output.exists():
+                logging.info(f"⏭️ Skipping {name} (already crawled: {fname})")
+                print(f"⏭️ Skipping {name} (already crawled: {fname})")
+                return
+
+            async with course_semaphore:
+                try:
+                    await crawl_course(crawler, run_config, name, url, semaphore, limiter, pool, frontier, stream)
+                except Exception as e:
+                    logging.error(f"❌ Failed to crawl course {name}: {e}")
+
+        try:
+            await asyncio.gather(*(bounded_crawl(name, url) for name, url in courses.items()))
+        finally:
+            pool.shutdown()
+            logging.info(f"Frontier: {frontier.stats()}")
+            frontier.close()
+            if stream:
+                stream.close()
+        logging.info(f"Page cache: {page_cache.hits} revalidated, {page_cache.renders} rendered")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,97 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    course      TEXT PRIMARY KEY,
+    url         TEXT,
+    status      TEXT,          -- crawling | done
+    updated_at  REAL
+);
+CREATE TABLE IF NOT EXISTS frontier (
+    url         TEXT,
+    course      TEXT,
+    idx         INTEGER,       -- position in the course menu
+    status      TEXT,          -- pending | done | failed
+    page        TEXT,          -- extracted page (JSON) once done
+    error       TEXT,
+    updated_at  REAL,
+    PRIMARY KEY (course, idx)
+);
+"""
+
+
+class CrawlFrontier:
+    """
+    Persistent crawl frontier backed by SQLite.
+    Every section URL is recorded with its status, and each section's extracted
+    page is checkpointed as soon as it is ready, so a restarted crawl skips
+    finished courses and only fetches the sections that are still missing.
+    """
+
+    def __init__(self, path: Path):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    # ---------- COURSES ----------
+    def course_done(self, course: str) -> bool:
+        row = self.conn.execute("SELECT status FROM courses WHERE course = ?", (course,)).fetchone()
+        return bool(row) and row[0] == "done"
+
+    def start_course(self, course: str, url: str, menu_links: list):
+        """Register a course and its sections; sections already known keep their status."""
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO courses (course, url, status, updated_at) VALUES (?, ?, 'crawling', ?) "
+            "ON CONFLICT(course) DO UPDATE SET status = 'crawling', updated_at = excluded.updated_at",
+            (course, url, now),
+        )
+        # A changed menu invalidates checkpoints stored under a different URL at the same index
+        self.conn.executemany(
+            "DELETE FROM frontier WHERE course = ? AND idx = ? AND url != ?",
+            [(course, idx, link["url"]) for idx, link in enumerate(menu_links)],
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO frontier (url, course, idx, status, updated_at) VALUES (?, ?, ?, 'pending', ?)",
+            [(link["url"], course, idx, now) for idx, link in enumerate(menu_links)],
+        )
+        self.conn.commit()
+
+    def finish_course(self, course: str):
+        self.conn.execute(
+            "UPDATE courses SET status = 'done', updated_at = ? WHERE course = ?", (time.time(), course)
+        )
+        self.conn.commit()
+
+    # ---------- SECTIONS ----------
+    def done_pages(self, course: str) -> dict:
+        """Return {menu index: extracted page} for every checkpointed section of a course."""
+        rows = self.conn.execute(
+            "SELECT idx, page FROM frontier WHERE course = ? AND status = 'done'", (course,)
+        ).fetchall()
+        return {idx: json.loads(page) for idx, page in rows}
+
+    def checkpoint_section(self, course: str, idx: int, page: dict):
+        self.conn.execute(
+            "UPDATE frontier SET status = 'done', page = ?, error = NULL, updated_at = ? WHERE course = ? AND idx = ?",
+            (json.dumps(page, ensure_ascii=False), time.time(), course, idx),
+        )
+        self.conn.commit()
+
+    def mark_failed(self, course: str, idx: int, error: str):
+        self.conn.execute(
+            "UPDATE frontier SET status = 'failed', error = ?, updated_at = ? WHERE course = ? AND idx = ?",
+            (error, time.time(), course, idx),
+        )
+        self.conn.commit()
+
+    def stats(self) -> dict:
+        rows = self.conn.execute("SELECT status, COUNT(*) FROM frontier GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self):
+        self.conn.close()
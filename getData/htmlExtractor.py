@@ -0,0 +1,228 @@
+import re
+from typing import Optional
+from urllib.parse import urljoin
+
+import lxml.html
+
+# ---------- FILTERS / CLEANUP ----------
+STOPWORDS = {
+    "the", "and", "for", "with", "from", "this", "that", "these", "those",
+    "click", "here", "your", "about", "into", "over", "under", "while",
+    "example", "examples", "tutorial", "introduction", "learn", "default"
+}
+JUNKWORDS = {"sales", "services", "contact", "analytics", "certificate", "certificates", "subscribe"}
+BAD_TERMS = {
+    "tutorial", "tutorials", "tip", "tips", "spaces", "w3", "w3css", "w3 css",
+    "w3schools", "navbar", "vertical", "building", "web building",
+    "default", "introduction", "learn", "overview", "home", "reference", "references"
+}
+
+
+def clean_word(text: str) -> Optional[str]:
+    """
+    Clean and filter a candidate glossary word/phrase.
+    Returns a normalized word (lowercase) or None if rejected.
+    """
+    if not text:
+        return None
+    w = text.strip().lower()
+    # replace other chars with space, allow a-z0-9 + # - .
+    w = re.sub(r"[^a-z0-9+#\-\.\s]", " ", w)
+    w = re.sub(r"\s+", " ", w).strip()
+
+    if len(w) < 2 or len(w) > 50:
+        return None
+
+    tokens = w.split()
+    if len(tokens) > 2:
+        return None
+
+    if w in BAD_TERMS:
+        return None
+    if any(tok in STOPWORDS for tok in tokens):
+        return None
+    if any(tok in JUNKWORDS for tok in tokens):
+        return None
+
+    if not re.search(r"[a-z]", w):
+        return None
+
+    return w
+
+
+# ---------- SINGLE-PASS EXTRACTION ----------
+# Candidate main-content regions, in order of preference: #main, .w3-main, body
+IN_MAIN, IN_W3_MAIN, IN_BODY = 1, 2, 4
+MAIN_TAGS = {"h2", "h3", "p", "li", "ul"}
+GLOSSARY_TAGS = {"h1", "h2", "h3", "strong", "b", "code"}
+
+
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header",
+    "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul",
+}
+
+
+def squashed_text(el) -> str:
+    """Element text with whitespace squashed and a line break around nested block elements."""
+    parts = []
+
+    def collect(node):
+        block = node.tag in BLOCK_TAGS
+        if block:
+            parts.append("\n")
+        if isinstance(node.tag, str) and node.text:
+            parts.append(node.text)
+        for child in node:
+            collect(child)
+            if child.tail:
+                parts.append(child.tail)
+        if block:
+            parts.append("\n")
+
+    collect(el)
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def code_text(el) -> str:
+    """Text of a code element, keeping line breaks from <br> (the tree is left untouched)."""
+    parts = []
+
+    def collect(node):
+        if node.tag == "br":
+            parts.append("\n")
+        elif isinstance(node.tag, str) and node.text:
+            parts.append(node.text)
+        for child in node:
+            collect(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    collect(el)
+    return "".join(parts)
+
+
+def extract_page(html: str, base_url: Optional[str] = None) -> dict:
+    """
+    Walk the page tree once and return everything the crawlers need from it:
+    title, summary, examples (code snippets), description, objectives, glossary,
+    and menu_links when base_url is given.
+    """
+    root = lxml.html.fromstring(html)
+
+    found = 0
+    main_items = []  # (region mask, tag, element) in document order
+    h1_texts = []
+    glossary_raw = set()
+    example_pre, w3_code, pre, code = [], [], [], []
+    menu_links, seen_links = [], set()
+
+    def walk(el, mask: int, in_example: bool, in_menu: bool):
+        nonlocal found
+        tag = el.tag
+        if not isinstance(tag, str):  # comments, processing instructions
+            return
+
+        classes = (el.get("class") or "").split()
+        if el.get("id") == "main":
+            mask |= IN_MAIN
+        if "w3-main" in classes:
+            mask |= IN_W3_MAIN
+        if tag == "body":
+            mask |= IN_BODY
+        found |= mask
+
+        if tag in MAIN_TAGS and mask:
+            main_items.append((mask, tag, el))
+
+        if tag in GLOSSARY_TAGS:
+            text = squashed_text(el)
+            if tag == "h1":
+                h1_texts.append(text)
+            w = clean_word(text)
+            if w:
+                glossary_raw.add(w)
+
+        if tag == "pre":
+            (example_pre if in_example else pre).append(el)
+        elif tag == "code":
+            code.append(el)
+        elif tag == "div" and "w3-code" in classes:
+            w3_code.append(el)
+
+        if in_menu and tag == "a" and base_url:
+            href = el.get("href")
+            text = squashed_text(el)
+            if href and text and not href.startswith("#") and not href.lower().startswith("javascript:"):
+                full = urljoin(base_url, href)
+                if full not in seen_links:
+                    seen_links.add(full)
+                    menu_links.append({"title": text, "url": full})
+
+        in_example = in_example or (tag == "div" and "w3-example" in classes)
+        in_menu = in_menu or el.get("id") == "leftmenuinner"
+        for child in el:
+            walk(child, mask, in_example, in_menu)
+
+    walk(root, 0, False, False)
+
+    region = next((r for r in (IN_MAIN, IN_W3_MAIN, IN_BODY) if found & r), 0)
+    main_texts = [(tag, el) for mask, tag, el in main_items if mask & region]
+
+    # Summary: h2/h3/p/li text inside the main area
+    summary_parts = []
+    for tag, el in main_texts:
+        if tag != "ul":
+            t = squashed_text(el)
+            if t:
+                summary_parts.append(t)
+
+    # Description: first meaningful paragraphs
+    description_parts = []
+    for tag, el in main_texts:
+        if tag == "p":
+            t = squashed_text(el)
+            if t:
+                description_parts.append(t)
+            if len(" ".join(description_parts)) > 900:
+                break
+
+    # Objectives: first <ul> with at least 2 items, else the first 5 <li>
+    objectives = []
+    for tag, el in main_texts:
+        if tag == "ul":
+            lis = [t for t in (squashed_text(li) for li in el.iter("li")) if t]
+            if len(lis) >= 2:
+                objectives = lis
+                break
+    if not objectives:
+        objectives = [t for t in (squashed_text(el) for tag, el in main_texts if tag == "li") if t][:5]
+
+    # Code snippets, most specific selectors first, deduplicated by fingerprint
+    snippets, seen = [], set()
+    for el in example_pre + w3_code + pre + code:
+        text = code_text(el)
+        if not text.strip():
+            continue
+        fp = (len(text), text[:80])
+        if fp in seen:
+            continue
+        seen.add(fp)
+        snippets.append(text.strip())
+
+    for link in menu_links:
+        w = clean_word(link["title"])
+        if w:
+            glossary_raw.add(w)
+
+    return {
+        "title": " ".join(t for t in h1_texts if t),
+        "summary": "\n".join(summary_parts),
+        "examples": snippets,
+        "description": " ".join(description_parts)[:1000],
+        "objectives": objectives[:10],
+        "glossary": sorted(glossary_raw)[:400],
+        "menu_links": menu_links,
+    }
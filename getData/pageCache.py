@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+# ---------- CONFIG ----------
+REVALIDATE_TIMEOUT = 15  # seconds
+USER_AGENT = "Mozilla/5.0 (compatible; W3TutorialCrawler/1.0)"
+
+
+def sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """
+    Content-addressed on-disk store of rendered pages, keyed by URL.
+
+    - objects/<hash[:2]>/<hash>.html   rendered HTML, stored once per distinct body
+    - meta/<sha256(url)>.json          url, body hash, ETag, Last-Modified, raw body hash
+
+    fetch() revalidates a cached page with a conditional GET (If-None-Match /
+    If-Modified-Since, or a hash of the raw body when the server sends no
+    validators) and only re-renders it through the browser when it changed.
+    With replay=True nothing touches the network: pages come from the cache or not at all.
+    """
+
+    def __init__(self, root: Path, replay: bool = False):
+        self.root = Path(root)
+        self.replay = replay
+        self.hits = 0
+        self.renders = 0
+        (self.root / "objects").mkdir(parents=True, exist_ok=True)
+        (self.root / "meta").mkdir(parents=True, exist_ok=True)
+
+    # ---------- STORAGE ----------
+    def _meta_path(self, url: str) -> Path:
+        return self.root / "meta" / f"{sha256(url)}.json"
+
+    def _object_path(self, body_hash: str) -> Path:
+        return self.root / "objects" / body_hash[:2] / f"{body_hash}.html"
+
+    def get_meta(self, url: str) -> Optional[dict]:
+        try:
+            with self._meta_path(url).open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_meta(self, url: str, meta: dict):
+        path = self._meta_path(url)
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> Optional[str]:
+        """Return the cached rendered HTML for url, or None."""
+        meta = self.get_meta(url)
+        if not meta:
+            return None
+        try:
+            return self._object_path(meta["body_hash"]).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return None
+
+    def put(self, url: str, html: str, headers: Optional[dict] = None, raw_hash: Optional[str] = None):
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        body_hash = sha256(html)
+        obj = self._object_path(body_hash)
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = obj.with_suffix(".tmp")
+            tmp_path.write_text(html, encoding="utf-8")
+            os.replace(tmp_path, obj)
+
+        self._write_meta(url, {
+            "url": url,
+            "body_hash": body_hash,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "raw_hash": raw_hash,
+            "fetched_at": time.time(),
+        })
+
+    # ---------- REVALIDATION ----------
+    def _conditional_get(self, url: str, meta: dict) -> Tuple[int, dict, Optional[str]]:
+        """Blocking conditional GET. Returns (status, headers, raw body hash)."""
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        if meta.get("etag"):
+            request.add_header("If-None-Match", meta["etag"])
+        if meta.get("last_modified"):
+            request.add_header("If-Modified-Since", meta["last_modified"])
+
+        try:
+            with urllib.request.urlopen(request, timeout=REVALIDATE_TIMEOUT) as response:
+                body = response.read().decode("utf-8", errors="replace")
+                return response.status, dict(response.headers), sha256(body)
+        except urllib.error.HTTPError as e:
+            return e.code, dict(e.headers or {}), None
+
+    async def fetch(self, url: str, render: Callable[[], Awaitable[Tuple[Optional[str], dict]]],
+                    throttle: Optional[Callable[[str], Awaitable[None]]] = None) -> Optional[str]:
+        """
+        Return the page HTML, re-rendering with `render()` only when the cached copy is
+        missing or stale. `render` returns (html, response_headers); `throttle(url)` is
+        awaited before the revalidation request, which is also made on a page's first fetch.
+        """
+        meta = self.get_meta(url)
+        cached = self.get(url) if meta else None
+
+        if self.replay:
+            if cached is None:
+                logging.warning(f"Replay miss (not cached): {url}")
+            return cached
+
+        # Pages seen for the first time get a plain GET too, so the next crawl can compare
+        # raw body hashes even when the server sends no ETag / Last-Modified
+        try:
+            if throttle:
+                await throttle(url)
+            status, probe_headers, raw_hash = await asyncio.to_thread(self._conditional_get, url, meta or {})
+        except Exception as e:
+            action = "re-rendering" if cached is not None else "rendering without a raw hash"
+            logging.warning(f"Revalidation failed for {url}, {action}: {e}")
+            status, probe_headers, raw_hash = None, {}, None
+        probe_headers = {k.lower(): v for k, v in probe_headers.items()}
+
+        if cached is not None:
+            unchanged = status == 304 or (status == 200 and raw_hash and raw_hash == meta.get("raw_hash"))
+            if unchanged:
+                self.hits += 1
+                meta.update({
+                    "etag": probe_headers.get("etag") or meta.get("etag"),
+                    "last_modified": probe_headers.get("last-modified") or meta.get("last_modified"),
+                    "fetched_at": time.time(),
+                })
+                self._write_meta(url, meta)
+                return cached
+
+        html, headers = await render()
+        self.renders += 1
+        if html:
+            headers = {**probe_headers, **{k.lower(): v for k, v in (headers or {}).items()}}
+            self.put(url, html, headers, raw_hash if status == 200 else None)
+        return html
@@ -0,0 +1,59 @@
+import json
+from pathlib import Path
+
+
+def section_record(course_name: str, idx: int, link: dict, page: dict) -> dict:
+    """One JSONL record per crawled section."""
+    return {
+        "type": "section",
+        "course": course_name,
+        "index": idx,
+        "url": link["url"],
+        "title": page["title"] or link.get("title", ""),
+        "summary": page["summary"],
+        "examples": page["examples"],
+    }
+
+
+def course_record(course_name: str, course_url: str, description: str, objectives: list, glossary: list) -> dict:
+    """Course-level fields, written once the course is finished."""
+    return {
+        "type": "course",
+        "course": course_name,
+        "url": course_url,
+        "description": description,
+        "objectives": objectives,
+        "glossary": glossary,
+    }
+
+
+class SectionStream:
+    """
+    Append-only JSONL writer for crawl output.
+    Each record is flushed as soon as it is written, so downstream steps can
+    consume the stream while the crawl is still running. Re-crawled sections are
+    appended again; readers keep the last record per (course, index).
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+        if self._torn():
+            # A crashed run left a partial last line; start ours on a fresh one
+            self._file.write("\n")
+            self._file.flush()
+
+    def _torn(self) -> bool:
+        if self.path.stat().st_size == 0:
+            return False
+        with self.path.open("rb") as f:
+            f.seek(-1, 2)
+            return f.read(1) != b"\n"
+
+    def write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
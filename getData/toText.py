@@ -1,38 +1,148 @@
+import hashlib
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+# ---------- CONFIG ----------
 source_folder_path = "data/W3_Tutorials_All"
 dist_folder_path = "data/W3_Tutorials_All_txt"
 
-# Make sure destination folder exists
-os.makedirs(dist_folder_path, exist_ok=True)
-
-for filename in os.listdir(source_folder_path):
-    source_file_path = os.path.join(source_folder_path, filename)
-    base_name, _ = os.path.splitext(filename)  # remove .json
-    dist_file_path = os.path.join(dist_folder_path, f"{base_name}.txt")
-
-    if os.path.isfile(source_file_path):
-        with open(source_file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        with open(dist_file_path, "w", encoding="utf-8") as out_f:
-            for section, snippets in data.items():
-                if isinstance(snippets, list):
-                    for item in snippets:
-                        if isinstance(item, str):
-                            out_f.write(item.strip() + "\n\n")
-                        elif isinstance(item, dict):
-                            # flatten dict values into text
-                            for k, v in item.items():
-                                if isinstance(v, str):
-                                    out_f.write(f"{k}: {v.strip()}\n")
-                                elif isinstance(v, list):
-                                    for sub in v:
-                                        if isinstance(sub, str):
-                                            out_f.write(sub.strip() + "\n")
-                            out_f.write("\n") 
-
-        print(f"Converted -> {base_name} to .txt")
-
-print("✅ Saved all JSON files as TXT")
+# Per-file state of the last run; the embedding step reads "changed"/"removed" from it
+manifest_path = os.path.join(dist_folder_path, "manifest.json")
+
+CONVERT_WORKERS = os.cpu_count() or 2
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def render_text(data: dict) -> str:
+    """Flatten one course JSON into the plain-text layout used for embedding."""
+    lines = []
+    for section, snippets in data.items():
+        if isinstance(snippets, list):
+            for item in snippets:
+                if isinstance(item, str):
+                    lines.append(item.strip() + "\n\n")
+                elif isinstance(item, dict):
+                    # flatten dict values into text
+                    for k, v in item.items():
+                        if isinstance(v, str):
+                            lines.append(f"{k}: {v.strip()}\n")
+                        elif isinstance(v, list):
+                            for sub in v:
+                                if isinstance(sub, str):
+                                    lines.append(sub.strip() + "\n")
+                    lines.append("\n")
+    return "".join(lines)
+
+
+def write_atomic(path: str, text: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def convert_file(source_file_path: str, dist_file_path: str, previous_hash: str = None) -> dict:
+    """
+    Convert one JSON file to TXT (runs in a worker process).
+    The TXT is left alone when the source bytes hash to `previous_hash`.
+    """
+    with open(source_file_path, "rb") as f:
+        raw = f.read()
+    source_hash = sha256(raw)
+
+    if source_hash == previous_hash and os.path.exists(dist_file_path):
+        return {"source_hash": source_hash, "changed": False}
+
+    text = render_text(json.loads(raw.decode("utf-8")))
+    write_atomic(dist_file_path, text)
+    # Same hash the embedding step computes over the stripped file content
+    return {"source_hash": source_hash, "txt_hash": sha256(text.strip().encode("utf-8")), "changed": True}
+
+
+def load_manifest() -> dict:
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def main():
+    os.makedirs(dist_folder_path, exist_ok=True)
+    previous = load_manifest().get("files", {})  # txt name -> entry from the last run
+
+    files, changed, failed = {}, [], []
+    jobs = {}
+    with ProcessPoolExecutor(max_workers=CONVERT_WORKERS) as pool:
+        for filename in sorted(os.listdir(source_folder_path)):
+            source_file_path = os.path.join(source_folder_path, filename)
+            base_name, ext = os.path.splitext(filename)  # remove .json
+            if ext != ".json" or not os.path.isfile(source_file_path):
+                continue
+
+            txt_name = f"{base_name}.txt"
+            dist_file_path = os.path.join(dist_folder_path, txt_name)
+            stat = os.stat(source_file_path)
+            entry = previous.get(txt_name)
+
+            # Cheap check first: same mtime and size means the source wasn't touched
+            if (entry and entry["source_mtime_ns"] == stat.st_mtime_ns and entry["source_size"] == stat.st_size
+                    and os.path.exists(dist_file_path)):
+                files[txt_name] = entry
+                continue
+
+            job = pool.submit(convert_file, source_file_path, dist_file_path, entry and entry["source_hash"])
+            jobs[job] = (txt_name, filename, stat, entry)
+
+        for job in as_completed(jobs):
+            txt_name, filename, stat, entry = jobs[job]
+            try:
+                result = job.result()
+            except Exception as e:
+                print(f"❌ Failed to convert {filename}: {e}")
+                failed.append(filename)
+                if entry:
+                    files[txt_name] = entry
+                continue
+
+            files[txt_name] = {
+                "source": filename,
+                "source_mtime_ns": stat.st_mtime_ns,
+                "source_size": stat.st_size,
+                "source_hash": result["source_hash"],
+                "txt_hash": result["txt_hash"] if result["changed"] else entry["txt_hash"],
+            }
+            if result["changed"]:
+                changed.append(txt_name)
+                print(f"Converted -> {txt_name}")
+
+    # TXT files whose JSON source is gone
+    removed = []
+    for txt_name in sorted(set(previous) - set(files)):
+        dist_file_path = os.path.join(dist_folder_path, txt_name)
+        if os.path.exists(dist_file_path):
+            os.remove(dist_file_path)
+        removed.append(txt_name)
+
+    with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": time.time(),
+            "files": files,
+            "changed": sorted(changed),
+            "removed": removed,
+        }, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    print(
+        f"✅ TXT up to date: {len(changed)} converted, {len(files) - len(changed)} unchanged, "
+        f"{len(removed)} removed, {len(failed)} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()